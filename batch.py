@@ -0,0 +1,180 @@
+import os
+import json
+import shutil
+import asyncio
+import argparse
+from pathlib import Path
+
+import manim_agent
+import render_pool
+import workspace
+import telemetry
+
+# Batch entry point: one input directory of screenshots per chapter.
+# LLM calls run in threads behind a semaphore, renders go to the warm render
+# worker pool, so a chapter can render while the next one is still waiting on
+# the model.
+# Progress is recorded in a manifest so an interrupted batch can be resumed.
+
+DONE = "done"
+FAILED = "failed"
+GENERATED = "generated"
+PENDING = "pending"
+
+
+def load_manifest(path):
+    if path.exists():
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def render_chapter(code_file, media_dir):
+    """Validate and render one chapter, returns (video path or None, error message)"""
+    error = manim_agent.validate_manim_code(code_file, media_dir)
+    if error:
+        return None, error
+
+    video, error = manim_agent.render_video(code_file, media_dir=media_dir, preview=False)
+    if video:
+        return str(video), None
+    return None, error or "No video file found in media directory"
+
+
+def chapter_names(input_dirs):
+    """{name: input dir}, each named after its directory plus as many parents as it takes to be unique"""
+    paths = list(dict.fromkeys(Path(d).resolve() for d in input_dirs))
+    parts = [path.relative_to(path.anchor).parts for path in paths]
+    depths = [1] * len(paths)
+    while True:
+        names = ["__".join(path_parts[-depth:]) for path_parts, depth in zip(parts, depths)]
+        clashing = [index for index, name in enumerate(names) if names.count(name) > 1]
+        if not clashing:
+            return dict(zip(names, paths))
+        for index in clashing:
+            depths[index] += 1
+
+
+async def process_chapter(name, input_dir, work_root, output_dir, llm_slots, manifest, manifest_path, max_attempts):
+    """Run one chapter; an exception fails only this chapter and is recorded in the manifest"""
+    try:
+        await run_chapter(name, input_dir, work_root, output_dir, llm_slots, manifest, manifest_path, max_attempts)
+    except Exception as e:
+        entry = manifest.setdefault(name, {"input_dir": str(input_dir), "attempts": 0})
+        error = f"{type(e).__name__}: {e}"
+        if entry.get("status") == DONE:
+            # The preview is already in output/, only the full quality render went wrong
+            entry.update(final_video=None, final_error=error[-2000:])
+        else:
+            entry.update(status=FAILED, error=error[-2000:])
+        save_manifest(manifest_path, manifest)
+        print(f"[{name}] failed: {error}")
+
+
+async def run_chapter(name, input_dir, work_root, output_dir, llm_slots, manifest, manifest_path, max_attempts):
+    entry = manifest.setdefault(name, {"input_dir": str(input_dir), "status": PENDING, "attempts": 0})
+    if entry["status"] == DONE:
+        print(f"[{name}] already done, skipping")
+        return
+    if entry["status"] == FAILED:
+        # Give previously failed chapters a fresh set of repair attempts
+        entry.update(status=GENERATED, attempts=0)
+
+    def update(**fields):
+        entry.update(fields)
+        save_manifest(manifest_path, manifest)
+
+    # Named after the chapter so a resumed batch finds its code again
+    run = workspace.create(work_root, name)
+    code_file = run["code_file"]
+    media_dir = run["media_dir"]
+
+    if entry["status"] != GENERATED or not code_file.exists():
+        print(f"[{name}] generating code")
+        async with llm_slots:
+            await asyncio.to_thread(manim_agent.generate_initial_manim_code, input_dir, code_file)
+        update(status=GENERATED, attempts=0)
+
+    while entry["attempts"] < max_attempts:
+        print(f"[{name}] render attempt {entry['attempts'] + 1}/{max_attempts}")
+        video, error = await asyncio.to_thread(render_chapter, str(code_file), str(media_dir))
+
+        if video:
+            output_path = output_dir / f"{name}.mp4"
+            shutil.copy(video, output_path)
+            update(status=DONE, video=str(output_path), error=None)
+            print(f"[{name}] generated video: {output_path}")
+            if manim_agent.final_render_enabled():
+                # Other chapters keep going while this one renders at full quality
+                final_video, final_error = await asyncio.wrap_future(manim_agent.queue_final_render(run, output_dir, stem=name))
+                update(final_video=str(final_video) if final_video else None, final_error=final_error and final_error[-2000:])
+                print(f"[{name}] final render {'ready: ' + str(final_video) if final_video else 'failed'}")
+            return
+
+        update(attempts=entry["attempts"] + 1, error=error[-2000:])
+        workspace.write_log(run, f"attempt_{entry['attempts']}.log", error)
+        if entry["attempts"] < max_attempts:
+            async with llm_slots:
+                await asyncio.to_thread(manim_agent.repair_manim_code, code_file, error)
+
+    update(status=FAILED)
+    print(f"[{name}] failed after {max_attempts} attempts")
+
+
+async def run_batch(input_dirs, work_root, output_dir, llm_concurrency=4, render_workers=None, max_attempts=5):
+    """Generate a tutorial for every input directory"""
+    work_root.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = work_root / "manifest.json"
+    manifest = load_manifest(manifest_path)
+    telemetry.set_report(work_root / "run.jsonl")
+
+    if render_workers:
+        render_pool.POOL_SIZE = render_workers
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    # Chapters with the same directory name in different places get their parents in the name
+    tasks = [
+        process_chapter(name, input_dir, work_root, output_dir, llm_slots, manifest, manifest_path, max_attempts)
+        for name, input_dir in chapter_names(input_dirs).items()
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        render_pool.shutdown()
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Manim tutorials for many chapters at once")
+    parser.add_argument("input_dirs", nargs="+", help="One directory of screenshots per chapter")
+    parser.add_argument("--work-dir", default="batch", help="Where per-chapter workspaces and the manifest are kept")
+    parser.add_argument("--output-dir", default=os.getenv("OUTPUT_DIR", "output"))
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--render-workers", type=int, default=None)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    args = parser.parse_args()
+
+    manifest = asyncio.run(run_batch(
+        args.input_dirs,
+        Path(args.work_dir),
+        Path(args.output_dir),
+        llm_concurrency=args.llm_concurrency,
+        render_workers=args.render_workers,
+        max_attempts=args.max_attempts,
+    ))
+
+    done = sum(1 for entry in manifest.values() if entry["status"] == DONE)
+    print(f"{done}/{len(manifest)} chapters rendered")
+    telemetry.print_summary()
+
+
+if __name__ == "__main__":
+    main()
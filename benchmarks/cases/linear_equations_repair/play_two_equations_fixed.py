@@ -0,0 +1,20 @@
+def play_two_equations(scene):
+    # Show the system:
+    #   1) x - 2y = 1
+    #   2) 3x + 2y = 11
+    eq_title = Text("1) Two equations, two unknowns", font_size=48, weight=BOLD)
+    shrink_to_fit(eq_title)
+    eq_title.to_edge(UP)
+
+    eqs = VGroup(
+        MathTex(r"x - 2y &= 1", font_size=48),
+        MathTex(r"3x + 2y &= 11", font_size=48),
+    ).arrange(DOWN, buff=0.5)
+    eqs.next_to(eq_title, DOWN, buff=0.8)
+    for eq in eqs:
+        shrink_to_fit(eq)
+
+    scene.play(Write(eq_title))
+    scene.play(LaggedStart(*[Write(eq) for eq in eqs], lag_ratio=0.4))
+    scene.wait(2)
+    scene.play(FadeOut(VGroup(eq_title, eqs)))
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from pathlib import Path
+
+# Render micro-benchmark.
+# Renders a fixed set of scenes that cover our workloads (text-heavy,
+# LaTeX-heavy, graph-heavy, voiceover) at one quality, first with an empty
+# media dir (cold: no Tex, text, voiceover or partial movie caches) and then
+# again over the same media dir (warm). Each render runs in its own process
+# with the same hooks as a render pool worker (dry run, Tex precompile, shared
+# media cache in a fresh directory per workload) and manim's hot spots wrapped
+# in timers, and the totals are compared against a stored baseline.
+# No baseline is committed, since the numbers depend on the machine: the first
+# run of a workload at a quality records its baseline in render_baseline.json.
+#
+#   python benchmarks/render_bench.py                      compare with the baseline, recording missing ones
+#   python benchmarks/render_bench.py --update-baseline    record a new baseline
+#   python benchmarks/render_bench.py binary_search -q m   one workload at medium quality
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "render_baseline.json"
+THRESHOLD = 0.15
+
+# name: (file, scene, module it needs beyond manim)
+WORKLOADS = {
+    "binary_search": ("templates/binary_search.py", "BinarySearch", None),
+    "segment_tree": ("templates/segment_tree_tutorial.py", "SegmentTreeTutorial", None),
+    "gamma_function": ("test/test.py", "FullTutorial", None),
+    "linear_equations": ("outputs.py", "FullTutorial", None),
+    "gradient_descent_voiceover": ("documentation/visualizer.py", "GradientDescentTutorial", "manim_voiceover"),
+}
+QUALITIES = {"l": "low_quality", "m": "medium_quality", "h": "high_quality"}
+STAGES = ("latex", "text", "rasterize", "encode")
+
+
+def timed(owner, attribute, stage, timings):
+    """Replace owner.attribute with a wrapper that adds its wall time to timings[stage]"""
+    original = getattr(owner, attribute)
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            timings[stage] += time.perf_counter() - started
+
+    setattr(owner, attribute, wrapper)
+    return original
+
+
+def worker(code_file, scene_name, media_dir, quality):
+    """Runs in the benchmark subprocess: render one scene and print its timings as JSON"""
+    from manim import tempconfig
+    from manim.constants import QUALITIES as MANIM_QUALITIES
+    from manim.camera.camera import Camera
+    from manim.mobject.text.text_mobject import MarkupText, Text
+    from manim.scene.scene_file_writer import SceneFileWriter
+    from manim.utils import tex_file_writing
+
+    # The same hooks a render pool worker has, so the numbers match what the agent pays
+    sys.path.insert(0, str(ROOT))
+    import media_cache
+    import render_pool
+
+    render_pool._init_worker()
+    media_cache.install(media_dir)
+
+    timings = {stage: 0.0 for stage in STAGES}
+    frames = [0]
+
+    # tex_to_svg_file looks these up in its module, so patching the module is enough
+    timed(tex_file_writing, "compile_tex", "latex", timings)
+    timed(tex_file_writing, "convert_to_svg", "latex", timings)
+    timed(Text, "_text2svg", "text", timings)
+    timed(MarkupText, "_text2svg", "text", timings)
+    timed(Camera, "capture_mobjects", "rasterize", timings)
+    timed(SceneFileWriter, "write_frame", "encode", timings)
+    timed(SceneFileWriter, "combine_to_movie", "encode", timings)
+
+    write_frame = SceneFileWriter.write_frame
+
+    def count_frames(self, frame_or_renderer):
+        frames[0] += 1
+        return write_frame(self, frame_or_renderer)
+
+    SceneFileWriter.write_frame = count_frames
+
+    code_file = Path(code_file).resolve()
+    sys.path.insert(0, str(code_file.parent))
+    spec = importlib.util.spec_from_file_location(code_file.stem, code_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    options = {**MANIM_QUALITIES[QUALITIES[quality]], "media_dir": str(media_dir), "input_file": str(code_file), "verbosity": "ERROR"}
+    started = time.perf_counter()
+    with tempconfig(options):
+        getattr(module, scene_name)().render()
+    total = time.perf_counter() - started
+
+    print(json.dumps({
+        "total": round(total, 3),
+        "frames": frames[0],
+        "fps": round(frames[0] / total, 2) if total else 0.0,
+        **{stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }))
+
+
+def run_workload(name, media_dir, quality):
+    """Render one workload in a fresh process, returns its timings or {"error"}"""
+    code_file, scene, _ = WORKLOADS[name]
+    # The shared media cache lives next to the media dir, so cold really starts empty
+    env = {**os.environ, "MEDIA_CACHE_DIR": str(Path(media_dir) / "shared-cache")}
+    result = subprocess.run(
+        [sys.executable, __file__, "--worker", str(ROOT / code_file), scene, str(media_dir), quality],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        return {"error": (result.stderr or result.stdout)[-2000:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """Regressions as (workload, mode, seconds, baseline seconds)"""
+    regressions = []
+    for name, modes in results.items():
+        for mode, timing in modes.items():
+            reference = baseline.get(name, {}).get(mode)
+            if "total" in timing and reference and timing["total"] > reference["total"] * (1 + threshold):
+                regressions.append((name, mode, timing["total"], reference["total"]))
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"\n{'workload':<28}{'cache':<6}{'total s':>9}{'base s':>9}{'frames':>8}{'fps':>8}" + "".join(f"{stage:>11}" for stage in STAGES))
+    for name, modes in results.items():
+        for mode, timing in modes.items():
+            if "error" in timing:
+                print(f"{name:<28}{mode:<6}  failed: {timing['error'].strip().splitlines()[-1] if timing['error'].strip() else ''}")
+                continue
+            reference = baseline.get(name, {}).get(mode, {}).get("total")
+            base = f"{reference:>9.2f}" if reference else f"{'-':>9}"
+            print(f"{name:<28}{mode:<6}{timing['total']:>9.2f}{base}{timing['frames']:>8}{timing['fps']:>8.1f}"
+                  + "".join(f"{timing[stage]:>11.2f}" for stage in STAGES))
+
+
+def record(baseline_path, quality, results):
+    """Store results as the baseline for quality, keeping the other workloads and qualities"""
+    stored = {}
+    if baseline_path.exists():
+        with open(baseline_path, 'r') as f:
+            stored = json.load(f)
+    stored[quality] = {**stored.get(quality, {}), **results}
+    with open(baseline_path, 'w') as f:
+        json.dump(stored, f, indent=2)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:6])
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark rendering of the sample scenes with cold and warm caches")
+    parser.add_argument("workloads", nargs="*", help=f"Subset of: {', '.join(WORKLOADS)}")
+    parser.add_argument("-q", "--quality", choices=QUALITIES, default="l")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f).get(args.quality, {})
+
+    results = {}
+    for name in args.workloads or WORKLOADS:
+        required = WORKLOADS[name][2]
+        if required and importlib.util.find_spec(required) is None:
+            print(f"Skipping {name}: {required} is not installed")
+            continue
+
+        media_dir = Path(tempfile.mkdtemp(prefix=f"render-bench-{name}-"))
+        try:
+            print(f"Rendering {name} (cold)")
+            cold = run_workload(name, media_dir, args.quality)
+            print(f"Rendering {name} (warm)")
+            warm = run_workload(name, media_dir, args.quality) if "error" not in cold else cold
+        finally:
+            shutil.rmtree(media_dir, ignore_errors=True)
+        results[name] = {"cold": cold, "warm": warm}
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    succeeded = {name: modes for name, modes in results.items() if all("error" not in timing for timing in modes.values())}
+    if args.update_baseline:
+        record(baseline_path, args.quality, succeeded)
+        print(f"Baseline written to {baseline_path}")
+        return
+
+    missing = {name: modes for name, modes in succeeded.items() if name not in baseline}
+    if missing:
+        record(baseline_path, args.quality, missing)
+        print(f"No {args.quality} baseline for {', '.join(missing)}: recorded this run as the baseline in {baseline_path}, "
+              "there is nothing to compare against until the next run")
+    regressions = compare(results, baseline, args.threshold)
+    for name, mode, seconds, reference in regressions:
+        print(f"REGRESSION {name} ({mode}): {seconds:.2f}s vs {reference:.2f}s baseline (+{(seconds / reference - 1) * 100:.0f}%)")
+    failed = [name for name, modes in results.items() if any("error" in timing for timing in modes.values())]
+    sys.exit(1 if regressions or failed else 0)
+
+
+if __name__ == "__main__":
+    main()
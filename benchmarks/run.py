@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+# Offline end-to-end benchmark.
+# Every case under benchmarks/cases has a case.json and a recording of the
+# model's responses. The pipeline runs in a fresh process against the replay
+# backend with the LLM, image and media caches pointed at empty directories, so
+# the numbers measure the pipeline itself: wall time, attempts, and the time
+# spent in each stage according to the run report.
+#
+#   python benchmarks/run.py                     all cases
+#   python benchmarks/run.py linear_equations    selected cases
+#   python benchmarks/run.py --output results.json
+
+ROOT = Path(__file__).resolve().parent.parent
+CASES_DIR = Path(__file__).resolve().parent / "cases"
+
+sys.path.insert(0, str(ROOT))
+import telemetry
+
+AGENT_COMMAND = "import manim_agent; manim_agent.main()"
+API_COMMAND = "import sys; sys.path.insert(0, 'documentation'); import api; api.get_code(sys.argv[1])"
+
+
+def load_case(case_dir):
+    with open(case_dir / "case.json", 'r') as f:
+        case = json.load(f)
+    case["name"] = case_dir.name
+    case["dir"] = case_dir
+    return case
+
+
+def run_case(case, final_render=False, keep=False):
+    """Run one case in a subprocess, returns its result record"""
+    work_dir = Path(tempfile.mkdtemp(prefix=f"bench-{case['name']}-"))
+    report = work_dir / "run.jsonl"
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "replay",
+        "LLM_REPLAY_FILE": str(case["dir"] / case["responses"]),
+        "LLM_CACHE": "0",
+        "IMAGE_CACHE_DIR": str(work_dir / "image_cache"),
+        "MEDIA_CACHE_DIR": str(work_dir / "media_cache"),
+        "RUNS_DIR": str(work_dir / "runs"),
+        "OUTPUT_DIR": str(work_dir / "output"),
+        "RUN_REPORT": str(report),
+        "FINAL_RENDER": "1" if final_render else "0",
+    }
+
+    if case.get("entry", "agent") == "api":
+        command = [sys.executable, "-c", API_COMMAND, case["prompt"]]
+    else:
+        env["INPUT_DIR"] = str((case["dir"] / case["input"]).resolve())
+        command = [sys.executable, "-c", AGENT_COMMAND]
+
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+
+    records = []
+    if report.exists():
+        with open(report, 'r') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    stages = telemetry.summary(records)
+
+    if case.get("entry", "agent") == "api":
+        attempts = stages.get("render", {}).get("count", 0)
+        ok = result.returncode == 0
+    else:
+        attempts = stages.get("attempt", {}).get("count", 0)
+        ok = result.returncode == 0 and any((work_dir / "output").glob("tutorial_*.mp4"))
+
+    record = {
+        "case": case["name"],
+        "ok": ok,
+        "wall": round(wall, 3),
+        "attempts": attempts,
+        "expected_attempts": case.get("expect_attempts"),
+        "llm_calls": stages.get("llm", {}).get("count", 0),
+        "stages": {name: round(stage["total"], 3) for name, stage in stages.items()},
+    }
+    if not ok:
+        record["log"] = (result.stdout + result.stderr)[-4000:]
+    if keep:
+        record["work_dir"] = str(work_dir)
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return record
+
+
+def print_results(results):
+    print(f"\n{'case':<28}{'ok':>4}{'wall s':>9}{'attempts':>10}{'llm':>5}  slowest stages")
+    for record in results:
+        slowest = sorted(record["stages"].items(), key=lambda item: -item[1])[:4]
+        stages = " ".join(f"{name}={seconds:.2f}" for name, seconds in slowest)
+        attempts = f"{record['attempts']}/{record['expected_attempts']}" if record["expected_attempts"] else str(record["attempts"])
+        print(f"{record['case']:<28}{'yes' if record['ok'] else 'NO':>4}{record['wall']:>9.2f}{attempts:>10}{record['llm_calls']:>5}  {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline pipeline benchmark against recorded LLM responses")
+    parser.add_argument("cases", nargs="*", help="Case names under benchmarks/cases (default: all)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--final-render", action="store_true", help="Include the background final render")
+    parser.add_argument("--keep", action="store_true", help="Keep each case's work directory")
+    args = parser.parse_args()
+
+    names = args.cases or sorted(path.name for path in CASES_DIR.iterdir() if (path / "case.json").exists())
+    results = []
+    for name in names:
+        case = load_case(CASES_DIR / name)
+        print(f"Running {name}: {case.get('description', '')}")
+        record = run_case(case, final_render=args.final_render, keep=args.keep)
+        if not record["ok"]:
+            print(record["log"])
+        results.append(record)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = [r for r in results if not r["ok"] or (r["expected_attempts"] and r["attempts"] != r["expected_attempts"])]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
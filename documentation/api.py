@@ -1,17 +1,27 @@
 import os
-from tqdm import tqdm
+import sys
+import time
+from pathlib import Path
 import anthropic
-from bs4 import BeautifulSoup
 import re
+from functools import lru_cache
 from manim import * 
 
+# Spans go to the same run report as the agent's, and renders share the agent's
+# media cache (see telemetry.py and media_cache.py at the repo root). Pages come
+# from the prebuilt index next to this file (build_index.py, doc_index.py).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import telemetry
+import replay
+import media_cache
+import doc_index
+import doc_search
+
 # -------------------------------------------------------------------------------------------
 
-client = anthropic.Anthropic()
+client = replay.ReplayClient() if replay.enabled() else anthropic.Anthropic()
 
-INPUT_DIR = "documentation/page_content"
 EXAMPLE_DIR = "documentation/examples"
-SUMMARY_DIR = "documentation/summary"
 MEDIA_OUTPUT_DIR = "documentation/downloaded_media"
 VOICEOVER_FILE_NAME = "documentation/voiceover_doc.txt"
 
@@ -23,44 +33,68 @@ First, understand the topic at hand. If there are multiple, focus on the first o
 Ensure that your Manim tutorial goes in depth to each of these topics, creating a detailed video of at least a minute explaining the topic, having an example, and ending in a summary. Compile all the events in a term called FullTutorial. Additionally, if you need to include equations, ensure that you write it in LaTeX that can be compiled accurately. It is essential that you write safe LaTeX that only uses valid characters and formatting such that there are no issues with it. Use other materials like graphs or plots as well. When writing the steps of each topic using the Manim Community library in Python, ensuring that your code works correctly. Output a valid solution that can be run, producing a correct video without any errors whatsoever. Ensure that the text all fits in the screen and does not overlap with one another. I will provide several example input outputs to you as well initially.
 """
 
-# -------------------------------------------------------------------------------------------
-
-# Examples
-SYSTEM += "\n\n===\nBelow are a few examples\n\n"
-
-for file_name in os.listdir(EXAMPLE_DIR):
-    path = os.path.join(EXAMPLE_DIR, file_name)
-    
-    with open(path, "rb") as f:
-        if "in" in file_name:
-            SYSTEM += "Input:\n"
-        else:
-            SYSTEM += "Output:\n"
-        
-        SYSTEM += str(f.read()) + "\n\n"
-
-# -------------------------------------------------------------------------------------------
-
-# Documentation
-SYSTEM += "\n===\nYou will be provided the full documentation of the Manim. You can find the full set of page links and associated summary of the given page of documentation below. To view the actual details of some given documentation, feel free to call the function aivailable to you. Don't be afraid to do tthis as accuracy is your highest priority!\n\n"
-
-for file_name in tqdm(os.listdir(INPUT_DIR)):
-    path_html = os.path.join(INPUT_DIR, file_name)
-    path_summ = os.path.join(SUMMARY_DIR, file_name.replace("html", "txt"))
+_static = None
 
-    with open(path_html, "rb") as f:
-        url = f.readline().decode('utf-8').strip()
-    
-    with open(path_summ, "rb") as f:
-        SYSTEM += f"{url}\n{f.read()}\n\n"
+def static_prompt_parts():
+    """The examples and the voiceover documentation, read once"""
+    global _static
+    if _static is not None:
+        return _static
 
-# -------------------------------------------------------------------------------------------
-
-# Voiceover (seperate from rest of documentation so include it fully here)
-SYSTEM += "\n\nThe documentation for voiceover is seperate so will be fully included below (no need to look specific voiceover stuff up that's included here)\n\n"
+    # Examples
+    examples = "\n\n===\nBelow are a few examples\n\n"
 
-with open(VOICEOVER_FILE_NAME, "rb") as f:
-    SYSTEM += str(f.read())
+    for file_name in os.listdir(EXAMPLE_DIR):
+        path = os.path.join(EXAMPLE_DIR, file_name)
+        
+        with open(path, "rb") as f:
+            if "in" in file_name:
+                examples += "Input:\n"
+            else:
+                examples += "Output:\n"
+            
+            examples += str(f.read()) + "\n\n"
+
+    # Voiceover (seperate from rest of documentation so include it fully here)
+    voiceover = "\n\nThe documentation for voiceover is seperate so will be fully included below (no need to look specific voiceover stuff up that's included here)\n\n"
+
+    with open(VOICEOVER_FILE_NAME, "rb") as f:
+        voiceover += str(f.read())
+
+    _static = (examples, voiceover)
+    return _static
+
+def documentation_listing(prompt):
+    """Page links and summaries for the system prompt: every page, or the ones ranked relevant to prompt"""
+    index = doc_index.load()
+    if doc_search.SELECTION == "full":
+        pages = [(name, index.url(name), index.summary(name)) for name in index.names()]
+        listing = "\n===\nYou will be provided the full documentation of the Manim. You can find the full set of page links and associated summary of the given page of documentation below. To view the actual details of some given documentation, feel free to call the function aivailable to you. Don't be afraid to do tthis as accuracy is your highest priority!\n\n"
+    else:
+        pages = doc_search.select(prompt)
+        listing = "\n===\nYou will be provided the documentation of the Manim most relevant to this request. You can find those page links and the associated summary of each page below. To view the actual details of some given documentation, feel free to call the function aivailable to you, also for any other page of https://docs.manim.community/en/stable/ (reference pages are named like reference/manim.mobject.geometry.arc.Circle.html). Don't be afraid to do tthis as accuracy is your highest priority!\n\n"
+
+    for _, url, summary in pages:
+        listing += f"{url}\n{summary}\n\n"
+    return listing, pages
+
+def system_prompt(prompt):
+    """The system prompt for one get_code() call"""
+    prompt_started = time.perf_counter()
+    examples, voiceover = static_prompt_parts()
+    listing, pages = documentation_listing(prompt)
+    system = SYSTEM + examples + listing + voiceover
+
+    print(f"[documentation] {len(pages)} pages ({doc_search.SELECTION}), ~{doc_search.estimate_tokens(listing)} tokens")
+    if doc_search.SELECTION != "full":
+        for _, url, _ in pages:
+            print(f"  {url}")
+    telemetry.event(
+        "prompt_assembly", time.perf_counter() - prompt_started,
+        chars=len(system), selection=doc_search.SELECTION, doc_pages=len(pages),
+        doc_tokens=doc_search.estimate_tokens(listing), doc_urls=[url for _, url, _ in pages],
+    )
+    return system
 
 # -------------------------------------------------------------------------------------------
 
@@ -68,62 +102,110 @@ with open(VOICEOVER_FILE_NAME, "rb") as f:
 def link_to_file_name(link):
     return link[39:].replace('/', '.')
 
-def extract_text_and_media(path):
-    with open(path, "rb") as f:
-        data = f.read()
-    soup = BeautifulSoup(data, "html.parser")
-    media_tags = soup.find_all(["img", "video"])
-    marker = "<<<MEDIA>>>"
-    media_list = []
-
-    # Get images and replace all of them with marker
-    for tag in media_tags:
-        if tag.name == "img":
-            src = tag.get("src") or tag.get("data‑src")
-            media_list.append(("image", src))
-        else:
-            src = tag.get("src")
-            if not src and tag.find("source"):
-                src = tag.find("source").get("src")
-            media_list.append(("video", src))
-        tag.replace_with(marker)
-
-    # Get all the texts and split based on marker
-    full_text = soup.get_text()
-    parts = [piece.strip() for piece in full_text.split(marker)]
-
-    # Interleave
-    result = []
-    for i, media in enumerate(media_list):
-        if parts[i]:
-            result.append(("text", parts[i]))
-        result.append(media)
-    if len(parts) > len(media_list) and parts[-1]:
-        result.append(("text", parts[-1]))
-
-    return result
-
-def construct_message_without_media(content):
+def construct_message_without_media(parts):
     message_content = []
-    for t, info in content:
-        if t == "image" or t == "video":
-            continue
-        else:
+    for info in parts:
+        if info:
             message_content.append({ "type": "text", "text": info })
 
     return { "role": "user", "content": message_content }
 
 # -------------------------------------------------------------------------------------------
 
-def send_query(url):
-    path = os.path.join(INPUT_DIR, link_to_file_name(url))
-
-    if not os.path.exists(path):
-        return "Provided url {url} does not exist. Please provide an existitng one"
-    
-    content = extract_text_and_media(path)
-
-    return str(construct_message_without_media(content))
+# Pages up to this many tokens come back whole; longer ones one section at a time
+PAGE_TOKEN_LIMIT = int(os.getenv("DOC_PAGE_TOKEN_LIMIT", "3000"))
+# A table of contents lists at most this many sections
+TOC_ENTRIES = int(os.getenv("DOC_TOC_ENTRIES", "40"))
+
+def matching_chunks(chunks, fragment=None, symbol=None):
+    """Chunks whose anchor is the URL fragment, or whose anchor or title names symbol"""
+    if fragment:
+        # The table of contents shortens anchors to their last parts, e.g. #Mobject.add
+        return [chunk for chunk in chunks if chunk["anchor"] == fragment or chunk["anchor"].endswith("." + fragment)]
+    if symbol:
+        symbol = symbol.lower().strip("()")
+        return [
+            chunk for chunk in chunks
+            if chunk["anchor"].lower() == symbol
+            or chunk["anchor"].lower().endswith("." + symbol)
+            or chunk["title"].lower() == symbol
+        ]
+    return []
+
+def short_anchors(chunks):
+    """{anchor: the part after the page's common module path}, e.g. Mobject.add for manim.mobject.mobject.Mobject.add"""
+    dotted = [chunk["anchor"].split(".") for chunk in chunks if "." in chunk["anchor"]]
+    prefix = len(os.path.commonprefix(dotted)) - 1 if dotted else 0
+    return {chunk["anchor"]: ".".join(chunk["anchor"].split(".")[max(prefix, 0):]) for chunk in chunks if chunk["anchor"]}
+
+def table_of_contents(index, name, chunks, skip=()):
+    """Section names and short #anchors only, no signatures, at most TOC_ENTRIES of them"""
+    url = index.url(name)
+    short = short_anchors(chunks)
+    entries = [chunk for chunk in chunks if chunk["anchor"] and chunk["anchor"] not in skip]
+    if not entries:
+        return ""
+    top = min(chunk["level"] for chunk in entries)
+    lines = [f"Other sections of {url} (ask again with url#anchor or the name to read one):"]
+    for chunk in entries[:TOC_ENTRIES]:
+        anchor = short[chunk["anchor"]]
+        title = anchor.rsplit(".", 1)[-1] if "." in chunk["anchor"] else chunk["title"]
+        lines.append(f"{'  ' * (chunk['level'] - top)}- {title} #{anchor}")
+    if len(entries) > TOC_ENTRIES:
+        lines.append(f"... and {len(entries) - TOC_ENTRIES} more; ask for a name to read its section")
+    return "\n".join(lines)
+
+@lru_cache(maxsize=int(os.getenv("DOC_QUERY_CACHE", "256")))
+def page_response(url, symbol=None, toc=True):
+    """(tool result, whether it lists the page's contents) or None if there is no such page;
+    the same lookups repeat across turns and attempts"""
+    index = doc_index.load()
+    page_url, _, fragment = url.partition("#")
+    name = link_to_file_name(page_url)
+
+    if name not in index.pages:
+        return None
+
+    chunks = index.chunks(name)
+    matches = matching_chunks(chunks, fragment, symbol)
+    sizes = [chunk["text"][1] for chunk in chunks]
+    if matches:
+        # The model asked for something specific: no table of contents
+        toc = False
+    elif sum(sizes) // 4 <= PAGE_TOKEN_LIMIT:
+        # Small enough to send as it is
+        matches = chunks
+    else:
+        # Start of the page, the rest on request
+        matches = chunks[:1]
+
+    parts = [index.chunk_text(chunk) for chunk in matches]
+    listed = False
+    if len(matches) < len(chunks):
+        if toc:
+            parts.append(table_of_contents(index, name, chunks, skip={chunk["anchor"] for chunk in matches}))
+            listed = True
+        else:
+            parts.append(f"({len(chunks) - len(matches)} more sections on {index.url(name)}; ask for another name or #anchor to read one)")
+    return str(construct_message_without_media(parts)), listed
+
+def send_query(url, symbol=None, listed_pages=None):
+    """Tool result for a lookup; listed_pages holds the pages whose contents this conversation already has"""
+    with telemetry.span("doc_query", url=url, symbol=symbol) as record:
+        page = url.partition("#")[0]
+        toc = listed_pages is None or page not in listed_pages
+        hits = page_response.cache_info().hits
+        response = page_response(url, symbol, toc)
+        record["cache_hit"] = page_response.cache_info().hits > hits
+
+        if response is None:
+            record["ok"] = False
+            return "Provided url {url} does not exist. Please provide an existitng one"
+        result, listed = response
+        if listed and listed_pages is not None:
+            listed_pages.add(page)
+        record["chars"] = len(result)
+        return result
 
 def extract_python_block(text):
     pattern = r"```python\n(.*?)\n```"
@@ -134,6 +216,10 @@ def extract_python_block(text):
 
 def get_code(prompt):
     caches = 0
+    attempts = 0
+    # Pages whose table of contents the model has already been sent
+    listed_pages = set()
+    system = system_prompt(prompt)
     messages = [{
         "role": "user",
         "content": f"""{prompt}
@@ -160,36 +246,48 @@ Here are some extremely important things that you must make sure to follow:
     while True:
         # 1) Keep using tool calling until code is generated
         while True:
-            message = client.messages.create(
-                model="claude-3-7-sonnet-20250219",
-                max_tokens=19999,
-                temperature=1,
-                system=SYSTEM,
-                tools = [
-                    {
-                        "name": "get_specific_documentatino_info",
-                        "description": "Gets specific documentation info from provided url",
-                        "input_schema": {
-                            "type": "object",
-                            "properties": {
-                                "url": {
-                                    "type": "string",
-                                    "description": "URL whose documentation info you want returned."
+            with telemetry.span("llm") as record:
+                message = client.messages.create(
+                    model="claude-3-7-sonnet-20250219",
+                    max_tokens=19999,
+                    temperature=1,
+                    system=system,
+                    tools = [
+                        {
+                            "name": "get_specific_documentatino_info",
+                            "description": "Gets specific documentation info from provided url",
+                            "input_schema": {
+                                "type": "object",
+                                "properties": {
+                                    "url": {
+                                        "type": "string",
+                                        "description": "URL whose documentation info you want returned. Long pages come back one section at a time with a table of contents; add a #anchor from it to get that section."
+                                    },
+                                    "name": {
+                                        "type": "string",
+                                        "description": "Optional class, method or section name on that page, e.g. Circle.point_at_angle, to get only its documentation."
+                                    },
                                 },
-                            },
-                            "required": ["url"]
+                                "required": ["url"]
+                            }
                         }
-                    }
-                ],
-                messages=messages
-            )
+                    ],
+                    messages=messages
+                )
+                record.update(
+                    input_tokens=message.usage.input_tokens,
+                    output_tokens=message.usage.output_tokens,
+                    cache_read=getattr(message.usage, "cache_read_input_tokens", None) or 0,
+                    cache_write=getattr(message.usage, "cache_creation_input_tokens", None) or 0,
+                    tool_calls=sum(info.type == "tool_use" for info in message.content),
+                )
 
             has_tool_call = False
             
             for info in message.content:
                 if info.type == "tool_use":
-                    print("[query]\n" + str(info.input["url"]) + "\n")
-                    result = send_query(info.input["url"])
+                    print("[query]\n" + str(info.input["url"]) + " " + str(info.input.get("name") or "") + "\n")
+                    result = send_query(info.input["url"], info.input.get("name"), listed_pages)
                     has_tool_call = True
 
                     messages.append({
@@ -234,10 +332,18 @@ Here are some extremely important things that you must make sure to follow:
                 if scene_cls is None:
                     raise ValueError("The provided code did not define a class 'FullTutorial'.")
 
+                media_cache.install(config.media_dir)
                 with tempconfig({"quality": quality}):
                     scene_cls().render()
 
-            run_manim(extract_python_block(messages[-1]["content"][0].text))
+            attempts += 1
+            with telemetry.span("render", attempt=attempts) as record:
+                try:
+                    run_manim(extract_python_block(messages[-1]["content"][0].text))
+                finally:
+                    counts = media_cache.stats(reset=True).values()
+                    record["media_hits"] = sum(kind["hits"] for kind in counts)
+                    record["media_misses"] = sum(kind["misses"] for kind in counts)
 
         except Exception as e:
             print("[error]\n" + str(e) + "\n")
@@ -246,4 +352,5 @@ Here are some extremely important things that you must make sure to follow:
 
         break
 
+    telemetry.print_summary()
     return extract_python_block(messages[-1]["content"][0].text)
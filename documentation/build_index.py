@@ -0,0 +1,290 @@
+import os
+import re
+import sys
+import json
+import time
+import struct
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Builds the documentation index that api.py reads.
+# Every page in page_content is parsed once into its plain text and stored,
+# together with its URL and summary, in one file:
+#
+#   MAGIC | header length (8 bytes) | header JSON | text blob
+#
+# The header maps each page to the (offset, length) of its summary and text
+# in the blob, plus the mtime, size and content hash of the sources it was
+# built from, so a rebuild only parses pages whose content changed, spread
+# over a process pool. Nothing parses HTML at request time: doc_index.py
+# memory-maps the file and decodes a page only when it is asked for.
+#
+# The main content of each page is also split into chunks at every heading
+# section and API entry (<section id> and <dt id>), each with its anchor,
+# title and nesting level, so the documentation tool can return one method's
+# docs instead of the whole page.
+#
+#   python documentation/build_index.py           update the index
+#   python documentation/build_index.py --full    rebuild every page
+#   DOC_INDEX_WORKERS=4 ...                       parse with 4 processes (default: one per CPU)
+
+DOC_DIR = Path(__file__).resolve().parent
+PAGES_DIR = DOC_DIR / "page_content"
+SUMMARY_DIR = DOC_DIR / "summary"
+INDEX_PATH = Path(os.getenv("DOC_INDEX", DOC_DIR / "index" / "docs.idx"))
+MAGIC = b"MANIMDOC3\n"
+WORKERS = int(os.getenv("DOC_INDEX_WORKERS", "0")) or os.cpu_count()
+# Below this many changed pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 8
+# Separates the text parts of a page (the text between its images and videos)
+PART_SEPARATOR = "\x1e"
+
+
+def extract_text_and_media(soup):
+    media_tags = soup.find_all(["img", "video"])
+    marker = "<<<MEDIA>>>"
+    media_list = []
+
+    # Get images and replace all of them with marker
+    for tag in media_tags:
+        if tag.name == "img":
+            src = tag.get("src") or tag.get("data‑src")
+            media_list.append(("image", src))
+        else:
+            src = tag.get("src")
+            if not src and tag.find("source"):
+                src = tag.find("source").get("src")
+            media_list.append(("video", src))
+        tag.replace_with(marker)
+
+    # Get all the texts and split based on marker
+    full_text = soup.get_text()
+    parts = [piece.strip() for piece in full_text.split(marker)]
+
+    # Interleave
+    result = []
+    for i, media in enumerate(media_list):
+        if parts[i]:
+            result.append(("text", parts[i]))
+        result.append(media)
+    if len(parts) > len(media_list) and parts[-1]:
+        result.append(("text", parts[-1]))
+
+    return result
+
+
+def is_anchor(tag):
+    return tag.name in ("section", "dt") and tag.get("id")
+
+
+def chunk_title(tag):
+    if tag.name == "section":
+        heading = tag.find(["h1", "h2", "h3", "h4", "h5", "h6"])
+        text = heading.get_text(" ", strip=True) if heading else tag["id"]
+    else:
+        text = tag.get_text().replace("[source]", "")
+    return " ".join(text.replace("¶", "").split())[:160]
+
+
+def extract_chunks(soup):
+    """Main content split at every anchored section and API entry: [{"anchor", "title", "level", "text"}]"""
+    from bs4 import NavigableString, Tag
+    from bs4.element import Comment, Doctype
+
+    root = soup.find("article") or soup.body or soup
+    chunks = [{"anchor": "", "title": "(top of page)", "level": 0, "strings": []}]
+    for node in root.descendants:
+        if isinstance(node, Tag):
+            if is_anchor(node):
+                level = len([parent for parent in node.parents if parent.name in ("section", "dl")])
+                chunks.append({"anchor": node["id"], "title": chunk_title(node), "level": level, "strings": []})
+        elif isinstance(node, NavigableString) and not isinstance(node, (Comment, Doctype)):
+            if node.parent.name not in ("script", "style"):
+                chunks[-1]["strings"].append(str(node))
+
+    result = []
+    for chunk in chunks:
+        text = re.sub(r"\n\s*\n+", "\n\n", "".join(chunk.pop("strings"))).strip()
+        if text or chunk["anchor"]:
+            result.append({**chunk, "text": text})
+    return result
+
+
+def source_stat(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_index(path=INDEX_PATH):
+    """(header, blob bytes) of an existing index, or (None, None)"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None, None
+            (length,) = struct.unpack(">Q", f.read(8))
+            header = json.loads(f.read(length))
+            blob = f.read()
+    except (FileNotFoundError, ValueError, struct.error):
+        return None, None
+    return header, blob
+
+
+def read_header(path=INDEX_PATH):
+    """Only the header of an existing index, or None"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack(">Q", f.read(8))
+            return json.loads(f.read(length))
+    except (FileNotFoundError, ValueError, struct.error):
+        return None
+
+
+def sources():
+    return sorted(path.name for path in PAGES_DIR.glob("*.html"))
+
+
+def is_stale(header):
+    """Whether any page or summary was added, removed or changed since the index was built"""
+    if header is None:
+        return True
+    pages = header["pages"]
+    names = sources()
+    if set(names) != set(pages):
+        return True
+    for name in names:
+        entry = pages[name]
+        if entry["html_stat"] != source_stat(PAGES_DIR / name):
+            return True
+        if entry["summary_stat"] != source_stat(SUMMARY_DIR / name.replace("html", "txt")):
+            return True
+    return False
+
+
+def content_hash(name):
+    """sha256 of a page's HTML and its summary"""
+    digest = hashlib.sha256((PAGES_DIR / name).read_bytes())
+    summary_path = SUMMARY_DIR / name.replace("html", "txt")
+    if summary_path.exists():
+        digest.update(summary_path.read_bytes())
+    return digest.hexdigest()
+
+
+def parse_page(name):
+    """URL, summary, text parts and chunks of one page"""
+    from bs4 import BeautifulSoup
+
+    path = PAGES_DIR / name
+    with open(path, "rb") as f:
+        data = f.read()
+    url = data.split(b"\n", 1)[0].decode('utf-8').strip()
+    summary_path = SUMMARY_DIR / name.replace("html", "txt")
+    summary = summary_path.read_text(errors="replace") if summary_path.exists() else ""
+
+    soup = BeautifulSoup(data, "html.parser")
+    # Chunks first: extract_text_and_media replaces the media tags in the tree
+    chunks = extract_chunks(soup)
+    parts = [info for kind, info in extract_text_and_media(soup) if kind == "text"]
+    return {"url": url, "summary": summary, "parts": parts, "chunks": chunks}
+
+
+def parse_pages(names, workers=None):
+    """{name: parsed page}, spread over a process pool when there is more than a handful"""
+    workers = workers or WORKERS
+    if len(names) <= PARALLEL_MIN_PAGES or workers <= 1:
+        return {name: parse_page(name) for name in names}
+    with ProcessPoolExecutor(workers) as pool:
+        return dict(zip(names, pool.map(parse_page, names, chunksize=max(1, len(names) // (workers * 4)))))
+
+
+def build(path=INDEX_PATH, full=False, workers=None):
+    """Bring the index up to date, parsing only pages whose content changed; returns the number parsed"""
+    started = time.perf_counter()
+    old_header, old_blob = (None, None) if full else read_index(path)
+    old_pages = old_header["pages"] if old_header else {}
+
+    # Same stats: unchanged. Different stats but the same content hash (a touch, a
+    # fresh checkout): unchanged too. Only the rest is parsed.
+    current = {}
+    reparse = []
+    for name in sources():
+        html_stat = source_stat(PAGES_DIR / name)
+        summary_stat = source_stat(SUMMARY_DIR / name.replace("html", "txt"))
+        old = old_pages.get(name)
+        if old and old["html_stat"] == html_stat and old["summary_stat"] == summary_stat:
+            digest = old["hash"]
+        else:
+            digest = content_hash(name)
+            if not old or old["hash"] != digest:
+                reparse.append(name)
+        current[name] = (html_stat, summary_stat, digest)
+
+    unchanged = all(
+        name in old_pages and (old_pages[name]["html_stat"], old_pages[name]["summary_stat"]) == stats[:2]
+        for name, stats in current.items()
+    )
+    if old_header is not None and not reparse and unchanged and set(current) == set(old_pages):
+        return 0
+
+    parsed = parse_pages(reparse, workers)
+
+    pages = {}
+    blob = bytearray()
+
+    def append(text):
+        data = text.encode("utf-8")
+        blob.extend(data)
+        return [len(blob) - len(data), len(data)]
+
+    def stored(span):
+        return old_blob[span[0]:sum(span)].decode("utf-8")
+
+    for name, (html_stat, summary_stat, digest) in current.items():
+        if name in parsed:
+            page = parsed[name]
+            summary, text, url = page["summary"], PART_SEPARATOR.join(page["parts"]), page["url"]
+            chunks = page["chunks"]
+        else:
+            # Unchanged: carry the stored text over without parsing
+            old = old_pages[name]
+            summary, text, url = stored(old["summary"]), stored(old["text"]), old["url"]
+            chunks = [{**chunk, "text": stored(chunk["text"])} for chunk in old["chunks"]]
+        pages[name] = {
+            "url": url,
+            "html_stat": html_stat,
+            "summary_stat": summary_stat,
+            "hash": digest,
+            "summary": append(summary),
+            "text": append(text),
+            "chunks": [{**chunk, "text": append(chunk["text"])} for chunk in chunks],
+        }
+
+    header = json.dumps({"built": time.time(), "pages": pages}).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(">Q", len(header)))
+        f.write(header)
+        f.write(blob)
+    # Readers that already mapped the old file keep reading it until they reload
+    os.replace(tmp_path, path)
+    print(f"Documentation index: parsed {len(parsed)} of {len(pages)} pages in {time.perf_counter() - started:.1f}s -> {path}")
+    return len(parsed)
+
+
+def main():
+    full = "--full" in sys.argv[1:]
+    if not full and not is_stale(read_header()):
+        print(f"Documentation index is up to date: {INDEX_PATH}")
+        return
+    build(full=full)
+
+
+if __name__ == "__main__":
+    main()
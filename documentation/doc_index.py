@@ -0,0 +1,62 @@
+import mmap
+import json
+import struct
+
+import build_index
+
+# Read side of the documentation index built by build_index.py.
+# Nothing is read at import time. The first call to load() checks the index
+# against its sources (rebuilding the pages that changed), reads the header
+# and memory-maps the rest, so a page's summary or text is only decoded when
+# something asks for it.
+
+PART_SEPARATOR = build_index.PART_SEPARATOR
+
+_index = None
+
+
+class DocIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(build_index.MAGIC)
+        (length,) = struct.unpack(">Q", self.map[start:start + 8])
+        header = json.loads(self.map[start + 8:start + 8 + length])
+        self.blob_start = start + 8 + length
+        self.pages = header["pages"]
+        self.by_url = {entry["url"]: name for name, entry in self.pages.items()}
+
+    def _read(self, span):
+        offset, length = span
+        return self.map[self.blob_start + offset:self.blob_start + offset + length].decode("utf-8")
+
+    def names(self):
+        return list(self.pages)
+
+    def url(self, name):
+        return self.pages[name]["url"]
+
+    def summary(self, name):
+        return self._read(self.pages[name]["summary"])
+
+    def text_parts(self, name):
+        """Text between the page's images and videos, in order"""
+        return self._read(self.pages[name]["text"]).split(PART_SEPARATOR)
+
+    def chunks(self, name):
+        """The page's sections and API entries as [{"anchor", "title", "level", "text": (offset, length)}]"""
+        return self.pages[name]["chunks"]
+
+    def chunk_text(self, chunk):
+        return self._read(chunk["text"])
+
+
+def load():
+    """The index, built or updated on first use"""
+    global _index
+    if _index is None:
+        if build_index.is_stale(build_index.read_header()):
+            build_index.build()
+        _index = DocIndex(build_index.INDEX_PATH)
+    return _index
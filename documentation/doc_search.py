@@ -0,0 +1,165 @@
+import os
+import re
+import math
+from collections import Counter
+from functools import lru_cache
+
+import doc_index
+
+# Picks the documentation pages worth putting in the system prompt.
+# Listing all 539 page summaries costs the same large input on every call
+# whatever the tutorial is about. Instead the pages are ranked with BM25
+# against the user's prompt, over each page's URL, summary and text, and the
+# best ones are listed until DOC_TOP_K pages or DOC_TOKEN_BUDGET tokens. Pages
+# documenting a manim symbol the prompt names (Axes, MathTex, ...) go first.
+# DOC_SELECTION=full brings back the complete listing for comparison.
+#
+# The BM25 statistics are computed from the index on first use (about a
+# second) and kept for the life of the process.
+
+SELECTION = os.getenv("DOC_SELECTION", "bm25")
+TOP_K = int(os.getenv("DOC_TOP_K", "40"))
+TOKEN_BUDGET = int(os.getenv("DOC_TOKEN_BUDGET", "8000"))
+K1 = 1.2
+B = 0.75
+# URL and summary words say what a page is about; the body is mostly detail
+FIELD_WEIGHTS = {"url": 3, "summary": 2, "text": 1}
+# Release notes, install and contributor guides mention everything and help with nothing here;
+# they are left out of the listing but the tool can still fetch them
+SKIPPED_PREFIXES = ("changelog", "contributing", "conduct", "installation")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "its", "of", "on",
+    "or", "that", "the", "this", "to", "with", "we", "you", "your", "can", "will", "use", "using", "make", "about",
+}
+
+_stats = None
+
+
+@lru_cache(maxsize=None)
+def word_tokens(word):
+    """A word lowercased, plus its camel case and underscore pieces if it has several"""
+    tokens = []
+    lower = word.lower()
+    if lower not in STOPWORDS and len(lower) > 1:
+        tokens.append(lower)
+    pieces = re.findall(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+", word)
+    if len(pieces) > 1:
+        tokens.extend(piece.lower() for piece in pieces if piece.lower() not in STOPWORDS and len(piece) > 1)
+    return tuple(tokens)
+
+
+def term_counts(text):
+    counts = Counter()
+    for word, count in Counter(re.findall(r"[A-Za-z][A-Za-z0-9_]*", text)).items():
+        for token in word_tokens(word):
+            counts[token] += count
+    return counts
+
+
+def tokenize(text):
+    """Lowercased words, with identifiers also split at camel case and underscores"""
+    return [token for word in re.findall(r"[A-Za-z][A-Za-z0-9_]*", text) for token in word_tokens(word)]
+
+
+def page_symbol(name):
+    """The class or function a reference page documents, e.g. MathTex, or None"""
+    parts = name[:-len(".html")].split(".")
+    if parts[0] == "reference" and parts[-1][:1].isupper():
+        return parts[-1]
+    return None
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def stats():
+    """Term frequencies per page, document frequencies and lengths, computed once"""
+    global _stats
+    if _stats is not None:
+        return _stats
+
+    index = doc_index.load()
+    frequencies = {}
+    lengths = {}
+    for name in index.names():
+        if name.startswith(SKIPPED_PREFIXES):
+            continue
+        counts = Counter()
+        fields = {
+            "url": index.url(name),
+            "summary": index.summary(name),
+            "text": " ".join(index.text_parts(name)),
+        }
+        for field, text in fields.items():
+            for token, count in term_counts(text).items():
+                counts[token] += count * FIELD_WEIGHTS[field]
+        frequencies[name] = counts
+        lengths[name] = sum(counts.values())
+
+    document_frequency = Counter()
+    for counts in frequencies.values():
+        document_frequency.update(counts.keys())
+
+    symbols = {}
+    for name in frequencies:
+        symbol = page_symbol(name)
+        if symbol:
+            symbols.setdefault(symbol.lower(), []).append(name)
+
+    _stats = {
+        "frequencies": frequencies,
+        "lengths": lengths,
+        "average_length": sum(lengths.values()) / max(len(lengths), 1),
+        "document_frequency": document_frequency,
+        "symbols": symbols,
+    }
+    return _stats
+
+
+def rank(query):
+    """[(page name, score)] best first, pages for symbols named in the query ahead of the rest"""
+    data = stats()
+    pages = len(data["frequencies"])
+    terms = Counter(tokenize(query))
+    scores = {}
+    for term, query_count in terms.items():
+        df = data["document_frequency"].get(term)
+        if not df:
+            continue
+        idf = math.log(1 + (pages - df + 0.5) / (df + 0.5))
+        for name, counts in data["frequencies"].items():
+            tf = counts.get(term)
+            if not tf:
+                continue
+            norm = K1 * (1 - B + B * data["lengths"][name] / data["average_length"])
+            scores[name] = scores.get(name, 0.0) + query_count * idf * tf * (K1 + 1) / (tf + norm)
+
+    # Symbols written as identifiers in the prompt are what the code will call
+    named = {word.lower() for word in re.findall(r"\b[A-Z][A-Za-z0-9]+\b", query)}
+    top = max(scores.values(), default=0.0)
+    for symbol in named:
+        for name in data["symbols"].get(symbol, []):
+            scores[name] = scores.get(name, 0.0) + top + 1.0
+
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def select(query, top_k=None, token_budget=None):
+    """Pages to list for query: [(name, url, summary)] within top_k pages and token_budget tokens"""
+    top_k = TOP_K if top_k is None else top_k
+    token_budget = TOKEN_BUDGET if token_budget is None else token_budget
+    index = doc_index.load()
+
+    selected = []
+    used = 0
+    for name, _ in rank(query):
+        if len(selected) >= top_k:
+            break
+        entry = f"{index.url(name)}\n{index.summary(name)}\n\n"
+        cost = estimate_tokens(entry)
+        if used + cost > token_budget:
+            continue
+        selected.append((name, index.url(name), index.summary(name)))
+        used += cost
+    return selected
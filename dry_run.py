@@ -0,0 +1,60 @@
+import os
+import sys
+
+import render_pool
+
+# Dry-run validation of generated tutorials.
+# The scene's construct runs in a warm render worker with manim's dry_run
+# config (no frames written, no movie encoded) and every animation skipped,
+# so each play/wait jumps straight to its end state. Runtime errors anywhere
+# in the tutorial show up in seconds as a plain Python traceback that the
+# repair loop can map back to the failing function.
+
+SCENE_NAME = "FullTutorial"
+TIMEOUT = int(os.getenv("DRY_RUN_TIMEOUT", "120"))
+
+
+def enabled():
+    """Set DRY_RUN=0 to go straight to the real render"""
+    return os.getenv("DRY_RUN", "1") != "0"
+
+
+def install():
+    """Make the renderer skip every animation, not only the ones before from_animation_number, while config.dry_run is set"""
+    from manim import config
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    update_skipping_status = CairoRenderer.update_skipping_status
+    if getattr(update_skipping_status, "_dry_run", False):
+        return
+
+    def skip_everything(self):
+        update_skipping_status(self)
+        if config.dry_run:
+            self.skip_animations = True
+
+    skip_everything._dry_run = True
+    CairoRenderer.update_skipping_status = skip_everything
+
+
+def check(code_file, scene_name=SCENE_NAME, timeout=TIMEOUT, media_dir=None, cancel=None):
+    """Dry-run code_file in a render worker, returns the traceback or None if construct finished"""
+    result = render_pool.render(code_file, scene_name, media_dir=media_dir, dry_run=True, cancel=cancel, timeout=timeout)
+    if result["ok"]:
+        return None
+    return render_pool.error_message(result)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"usage: {sys.argv[0]} code_file [scene]", file=sys.stderr)
+        sys.exit(2)
+    error = check(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else SCENE_NAME)
+    if error:
+        print(error, file=sys.stderr)
+        sys.exit(1)
+    print("construct finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import io
+import json
+import base64
+import hashlib
+from pathlib import Path
+from PIL import Image, ImageChops
+
+import telemetry
+import media_cache
+
+# Screenshot preprocessing before they are sent to the model: trim the page
+# margins, downscale to MAX_EDGE, recompress, and drop near-duplicates by
+# perceptual hash. Encoded payloads are memoized by the hash of the source
+# bytes (in memory and under CACHE_DIR, part of the shared media cache), so
+# each screenshot is encoded once.
+
+MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1568"))
+COLORS = int(os.getenv("IMAGE_COLORS", "256"))
+DEDUPE_DISTANCE = int(os.getenv("IMAGE_DEDUPE_DISTANCE", "4"))
+CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", media_cache.ROOT / "images"))
+
+_memo = {}
+
+
+def trim_margins(image, tolerance=16):
+    """Crop away the uniform border around the page content"""
+    rgb = image.convert("RGB")
+    background = Image.new("RGB", rgb.size, rgb.getpixel((0, 0)))
+    mask = ImageChops.difference(rgb, background).convert("L").point(lambda p: 255 if p > tolerance else 0)
+    bbox = mask.getbbox()
+    return rgb.crop(bbox) if bbox else rgb
+
+
+def dhash(image, size=8):
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale copy"""
+    small = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def preprocess(image_path):
+    """Return {"data", "media_type", "dhash"} for a screenshot, computing it at most once"""
+    with open(image_path, "rb") as f:
+        raw = f.read()
+
+    key = hashlib.sha256(raw + f"{MAX_EDGE}:{COLORS}".encode()).hexdigest()
+    if key in _memo:
+        return _memo[key]
+
+    cache_path = CACHE_DIR / f"{key}.json"
+    if cache_path.exists():
+        with open(cache_path, "r") as f:
+            _memo[key] = json.load(f)
+        # Mark as recently used for the media cache's eviction
+        os.utime(cache_path)
+        media_cache.record("images", True)
+        return _memo[key]
+    media_cache.record("images", False)
+
+    image = trim_margins(Image.open(io.BytesIO(raw)))
+    image.thumbnail((MAX_EDGE, MAX_EDGE), Image.Resampling.LANCZOS)
+    if COLORS:
+        image = image.quantize(colors=COLORS, method=Image.Quantize.MEDIANCUT)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    entry = {
+        "data": base64.b64encode(buffer.getvalue()).decode('utf-8'),
+        "media_type": "image/png",
+        "dhash": dhash(image),
+    }
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, cache_path)
+
+    _memo[key] = entry
+    return entry
+
+
+def prepare_images(image_paths):
+    """Preprocess screenshots in order, skipping ones that look like an earlier one"""
+    kept = []
+    with telemetry.span("image_encoding", images=len(image_paths)) as record:
+        before = media_cache.stats().get("images", {"hits": 0, "misses": 0})
+        for path in image_paths:
+            entry = preprocess(path)
+            if any(hamming(entry["dhash"], other["dhash"]) <= DEDUPE_DISTANCE for other in kept):
+                print(f"Skipping near-duplicate screenshot: {path}")
+                continue
+            kept.append(entry)
+        record["kept"] = len(kept)
+        after = media_cache.stats().get("images", {"hits": 0, "misses": 0})
+        record["media_hits"] = after["hits"] - before["hits"]
+        record["media_misses"] = after["misses"] - before["misses"]
+    return kept
+
+
+def image_blocks(image_paths):
+    """Messages API image blocks for the deduplicated, downscaled screenshots"""
+    return [
+        {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": entry["media_type"],
+                "data": entry["data"]
+            }
+        }
+        for entry in prepare_images(image_paths)
+    ]
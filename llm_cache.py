@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+# Content-addressed on-disk cache for llm() responses.
+# Entries live under CACHE_DIR/<2 hex chars>/<sha256>.json. The mtime of an
+# entry is bumped on every hit, so evicting by oldest mtime gives LRU order.
+
+CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR", ".cache/llm"))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def enabled():
+    """Set LLM_CACHE=0 to bypass the cache entirely"""
+    return os.getenv("LLM_CACHE", "1") != "0"
+
+
+def normalize(value):
+    """Strip whitespace noise from every string in a prompt chain"""
+    if isinstance(value, str):
+        return "\n".join(line.rstrip() for line in value.strip().splitlines())
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def cache_key(prompt_chain, model, params=None):
+    """Hash the normalized prompt chain together with the model and call parameters"""
+    payload = json.dumps(
+        {"model": model, "params": params or {}, "messages": normalize(prompt_chain)},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key):
+    """Return the cached response for key, or None on a miss"""
+    path = _entry_path(key)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+        # Mark as recently used; an entry evicted since the read counts as a miss
+        os.utime(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return entry["response"]
+
+
+def put(key, response):
+    """Store a response atomically, then trim the cache back under MAX_BYTES"""
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "response": response}, f)
+    os.replace(tmp_path, path)
+
+    evict()
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for path in CACHE_DIR.glob("*/*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
@@ -0,0 +1,102 @@
+import os
+import codeop
+
+# Incremental <output> extraction for streamed completions.
+# Tokens are fed in as they arrive; once the opening tag shows up the code is
+# written straight to disk and periodically checked with codeop, which can tell
+# "not finished yet" apart from "can never parse", so broken generations can
+# be cut off before the rest of the response is paid for.
+
+
+class GenerationAborted(Exception):
+    pass
+
+
+def enabled():
+    """Set LLM_STREAM=1 to stream completions instead of waiting for the full response"""
+    return os.getenv("LLM_STREAM", "0") == "1"
+
+
+class OutputStream:
+    def __init__(self, output_file=None, tag="output", check_every=20):
+        self.output_file = output_file
+        self.open_tag = f"<{tag}>"
+        self.close_tag = f"</{tag}>"
+        self.check_every = check_every
+
+        self.text = ""
+        self.start = None
+        self.written = 0
+        self.checked_lines = 0
+        self.done = False
+        self._file = None
+
+    @property
+    def code(self):
+        """Code received so far inside the output block"""
+        if self.start is None:
+            return ""
+        body = self.text[self.start:]
+        end = body.find(self.close_tag)
+        return body if end == -1 else body[:end]
+
+    def feed(self, delta):
+        """Consume the next chunk of the completion"""
+        self.text += delta
+        if self.done:
+            return
+
+        if self.start is None:
+            index = self.text.find(self.open_tag)
+            if index == -1:
+                return
+            self.start = index + len(self.open_tag)
+            if self.output_file:
+                self._file = open(self.output_file, "w")
+
+        body = self.text[self.start:]
+        end = body.find(self.close_tag)
+        if end != -1:
+            body = body[:end]
+            self.done = True
+        else:
+            # Hold back anything that could be the start of the closing tag
+            body = body[:max(self.written, len(body) - len(self.close_tag) + 1)]
+
+        self._write(body)
+
+        if self.done:
+            self._close_file()
+        else:
+            self._check(body)
+
+    def close(self):
+        """Flush the file once the completion has finished"""
+        if self.start is not None and not self.done:
+            self._write(self.code)
+        self._close_file()
+
+    def _write(self, body):
+        if self._file and len(body) > self.written:
+            self._file.write(body[self.written:])
+            self._file.flush()
+        self.written = max(self.written, len(body))
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _check(self, body):
+        # Only look at complete lines, and not after every single token
+        complete = body[:body.rfind("\n") + 1]
+        lines = complete.count("\n")
+        if lines - self.checked_lines < self.check_every:
+            return
+        self.checked_lines = lines
+
+        try:
+            codeop.compile_command(complete.strip("\n"), self.output_file or "<output>", "exec")
+        except SyntaxError as e:
+            self._close_file()
+            raise GenerationAborted(f"line {e.lineno}: {e.msg}")
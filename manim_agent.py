@@ -1,34 +1,154 @@
 import os
-import subprocess
 import re
-import time
-import base64
+import ast
+import shutil
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import anthropic
 from dotenv import load_dotenv
+import llm_cache
+import image_prep
+import preflight
+import tex_precompile
+import sections
+import repair
+import dry_run
+import render_pool
+import workspace
+import telemetry
+import replay
+import llm_stream
+import optimizer
 
 load_dotenv()
-client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_KEY"))
+# ANTHROPIC_BASE_URL points the client at a local stub (see test/stub_anthropic.py),
+# LLM_BACKEND=replay answers from recorded responses instead (see replay.py)
+if replay.enabled():
+    client = replay.ReplayClient()
+else:
+    client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_KEY"), base_url=os.getenv("ANTHROPIC_BASE_URL"))
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+MODEL = "claude-3-7-sonnet-20250219"
+MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "16000"))
 
-def llm(prompt_chain):
-    response = client.chat.completions.create(
-        model="claude-3-7-sonnet-20250219",
-        messages=prompt_chain
-    )
-    return response.choices[0].message.content
+# Marks the end of a prompt prefix for provider-side prompt caching
+CACHE_BREAKPOINT = {"type": "ephemeral"}
+# Repairs iterate at low quality; the accepted version is rendered again at this quality in the background
+FINAL_QUALITY = os.getenv("FINAL_QUALITY", "h")
+if FINAL_QUALITY not in sections.QUALITY_DIRS:
+    print(f"Unknown FINAL_QUALITY {FINAL_QUALITY!r}, expected one of {'/'.join(sections.QUALITY_DIRS)}; using h")
+    FINAL_QUALITY = "h"
+final_renders = ThreadPoolExecutor(max_workers=int(os.getenv("FINAL_RENDER_WORKERS", "1")))
+
+def to_messages_request(prompt_chain, **params):
+    """Split the system prompt out of a prompt chain for the Messages API"""
+    system = []
+    messages = []
+    for message in prompt_chain:
+        if message["role"] != "system":
+            messages.append(message)
+        elif isinstance(message["content"], str):
+            system.append({"type": "text", "text": message["content"]})
+        else:
+            system.extend(message["content"])
+
+    return {"model": MODEL, "max_tokens": MAX_TOKENS, "system": system, "messages": messages, **params}
+
+def report_usage(usage, record=None):
+    """Print token counts for a call, including prompt cache reads and writes"""
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    if record is not None:
+        record.update(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens, cache_read=cache_read, cache_write=cache_write)
+    print(f"LLM tokens: input={usage.input_tokens} output={usage.output_tokens} "
+          f"cache_read={cache_read} cache_write={cache_write}")
+
+def llm(prompt_chain, use_cache=True, stream=None, variant=None, **params):
+    """Call the model, serving byte-identical prompt chains from the on-disk cache"""
+    use_cache = use_cache and llm_cache.enabled()
+    # variant only separates cache entries, e.g. for parallel repair candidates
+    key = llm_cache.cache_key(prompt_chain, MODEL, {**params, "variant": variant} if variant is not None else params)
+
+    with telemetry.span("llm", streamed=stream is not None, cache_hit=False) as record:
+        if use_cache:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                print("Using cached LLM response")
+                record["cache_hit"] = True
+                if stream is not None:
+                    stream.feed(cached)
+                    stream.close()
+                return cached
+
+        if stream is None:
+            response = client.messages.create(**to_messages_request(prompt_chain, **params))
+            report_usage(response.usage, record)
+            content = "".join(block.text for block in response.content if block.type == "text")
+        else:
+            content = llm_streamed(prompt_chain, stream, record, **params)
+
+    if use_cache:
+        llm_cache.put(key, content)
+    return content
 
+def llm_streamed(prompt_chain, stream, record=None, **params):
+    """Feed the completion into an OutputStream token by token as it arrives"""
+    # Leaving the context manager early closes the connection when the stream aborts
+    with client.messages.stream(**to_messages_request(prompt_chain, **params)) as response:
+        for delta in response.text_stream:
+            stream.feed(delta)
+        report_usage(response.get_final_message().usage, record)
+
+    stream.close()
+    return stream.text
 
 def xml_parser(text, tags):
     pattern = rf"<{tags}>(.*?)</{tags}>"
     matches = re.findall(pattern, text, re.DOTALL)
     return matches[0].strip() if matches else text
 
-def generate_initial_manim_code():
-    """Generate initial Manim code based on input screenshots"""
+def llm_code(prompt_chain, output_file, stream_retries=2):
+    """Ask the model for code in <output> tags and write it to output_file"""
+    code = None
+
+    if llm_stream.enabled():
+        for _ in range(stream_retries + 1):
+            stream = llm_stream.OutputStream(output_file)
+            try:
+                code = xml_parser(llm(prompt_chain, stream=stream), "output")
+                break
+            except llm_stream.GenerationAborted as e:
+                print(f"Aborted broken generation early ({e}), retrying")
+
+    if code is None:
+        code = xml_parser(llm(prompt_chain), "output")
+
+    code = optimizer.optimize_code(code)
+    with open(output_file, 'w') as f:
+        f.write(code)
+    return code
+
+def helpers_reference(path=Path(__file__).resolve().parent / "tutorial_helpers.py"):
+    """What tutorial_helpers exports, as prompt text, read from its source so manim isn't imported here"""
+    tree = ast.parse(path.read_text())
+    version = next(
+        node.value.value for node in tree.body
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__version__" for t in node.targets)
+    )
+    lines = [f"tutorial_helpers (version {version}), imported with `from tutorial_helpers import *` after `from manim import *`:"]
+    constants = [
+        target.id for node in tree.body if isinstance(node, ast.Assign)
+        for target in node.targets if isinstance(target, ast.Name) and not target.id.startswith("_")
+    ]
+    lines.append(f"- constants: {', '.join(constants)}")
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and not node.name.startswith("_"):
+            lines.append(f"- {node.name}({ast.unparse(node.args)}): {ast.get_docstring(node)}")
+    return "\n".join(lines)
+
+def initial_prompt_chain(inputs_dir=None):
+    """System prompt, few-shot examples and the screenshots as one prompt chain"""
     system = """
     You are an agent that is an expert at Manim, a Python library that can be compiled to create video tutorials for educational materials. Your task is to take in a textbook chapter covering some material and create an educational tutorial using Manim, detailing technical parts of the textbook to make it intuitive. The idea is to have different sections covering the topic, with visualizations of mathematical concepts and explanatory text as needed. 
 
@@ -38,6 +158,10 @@ def generate_initial_manim_code():
     
     Make sure to use other materials like graphs, diagrams, or plots as well, don't just write bullet points. When writing the steps of each topic using the Manim Community library in Python, ensuring that your code works correctly. Output a valid solution that can be run, producing a correct video without any errors whatsoever. 
     """
+    system += f"""
+    Don't write your own versions of the helpers below, import them instead. They keep text inside the frame and reuse text mobjects that appear more than once.
+    {helpers_reference()}
+    """
 
     prompt_chain = [{"role": "system", "content": system}]
 
@@ -56,20 +180,19 @@ def generate_initial_manim_code():
             prompt_chain.append({"role": "user", "content": input_text})
             prompt_chain.append({"role": "assistant", "content": output_text})
 
-    inputs_dir = Path(os.getenv("INPUT_DIR", "input"))
+    # The system prompt and examples are identical across runs, only the screenshots
+    # change. A single breakpoint after the last example caches that whole prefix;
+    # the system prompt alone is below the minimum cacheable length.
+    prefix_end = prompt_chain[-1]
+    if isinstance(prefix_end["content"], str):
+        prefix_end["content"] = [{"type": "text", "text": prefix_end["content"]}]
+    prefix_end["content"][-1]["cache_control"] = CACHE_BREAKPOINT
+
+    inputs_dir = Path(inputs_dir or os.getenv("INPUT_DIR", "input"))
     image_files = sorted([f for f in inputs_dir.glob("*.png")])
-    image_contents = []
+    image_contents = image_prep.image_blocks(image_files)
     
-    if image_files:
-        for img_file in image_files:
-            base64_image = encode_image(img_file)
-            image_contents.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}"
-                }
-            })
-    else:
+    if not image_files:
         print("No input images found in input directory")
     
     prompt_chain.append({
@@ -79,13 +202,16 @@ def generate_initial_manim_code():
             *image_contents
         ]
     })
+    return prompt_chain
+
+def generate_initial_manim_code(inputs_dir=None, output_file='outputs.py'):
+    """Generate initial Manim code based on input screenshots"""
+    with telemetry.span("prompt_assembly"):
+        prompt_chain = initial_prompt_chain(inputs_dir)
 
-    output = xml_parser(llm(prompt_chain=prompt_chain), "output")
-    print(output)
-    
     # Write to outputs.py
-    with open('outputs.py', 'w') as f:
-        f.write(output)
+    output = llm_code(prompt_chain, output_file)
+    print(output)
     
     return output
 
@@ -95,34 +221,202 @@ def create_output_dir():
     output_dir.mkdir(exist_ok=True)
     return output_dir
 
-def run_manim_compilation(output_file, max_attempts=5):
-    """Run Manim compilation with error handling and automatic fixes"""
+def render_manim(output_file, media_dir=None, preview=True, cancel=None):
+    """Render FullTutorial from output_file at low quality in a warm worker"""
+    media_dir = Path(media_dir or "media")
+    output = media_dir / "videos" / Path(output_file).stem / "480p15" / "FullTutorial.mp4"
+    with telemetry.span("render", quality="l") as record:
+        result = render_pool.render(output_file, "FullTutorial", "l", output=output, media_dir=media_dir, preview=preview, cancel=cancel)
+        record["ok"] = result["ok"]
+    return result
+
+def render_video(output_file, media_dir=None, preview=True, cancel=None):
+    """Render the tutorial, returns (video path or None, error message or None)"""
+    media_dir = Path(media_dir or "media")
+
+    if sections.enabled():
+        with open(output_file, 'r') as f:
+            can_split = sections.split_sections(f.read()) is not None
+        if can_split:
+            return sections.render_sections(output_file, media_dir, cancel=cancel)
+
+    result = render_manim(output_file, media_dir=media_dir, preview=preview, cancel=cancel)
+    if not result["ok"]:
+        return None, render_pool.error_message(result)
+    return Path(result["video"]), None
+
+def whole_file_request(code, error):
+    return [ {"role": "system", "content": "You are an expert at fixing Manim compilation errors. Fix the code while maintaining its original functionality."},
+            {"role": "user", "content": f"Here is the Manim code that failed to compile:\n\n{code}\n\nError message:\n{error}\n\nPlease provide the fixed code that will compile successfully. Write your python output in <output></output> tags"}]
+
+def section_fix(code, error, output_file, variant=None):
+    """Fixed code from a request for just the failing function, or None if that isn't possible"""
+    unit = repair.locate(code, error, output_file)
+    if unit is None:
+        return None
+
+    fix = xml_parser(llm(repair.section_request(code, unit, error), variant=variant), "output")
+    patched = repair.splice(code, unit, fix)
+    if patched is None:
+        print(f"Fix for {unit['name']} didn't fit back into the file, asking for the whole file")
+    else:
+        print(f"Repaired {unit['name']} only")
+        patched = optimizer.optimize_code(patched)
+    return patched
+
+def repair_manim_code(output_file, error):
+    """Ask the model to fix the code in output_file given the render error"""
+    with open(output_file, 'r') as f:
+        current_code = f.read()
+    
+    with telemetry.span("repair", scope="function") as record:
+        # Send only the failing function when the error can be pinned to one
+        patched = section_fix(current_code, error, output_file)
+        if patched is not None:
+            with open(output_file, 'w') as f:
+                f.write(patched)
+            return patched
+        
+        record["scope"] = "file"
+        return llm_code(whole_file_request(current_code, error), output_file)
+
+def speculative_repair(output_file, error, candidates, media_dir=None):
+    """Race several fixes against each other, returns (video, error) for the winner or the first failure"""
+    output_file = Path(output_file)
+    media_dir = Path(media_dir or "media")
+    current_code = output_file.read_text()
+    cancel = threading.Event()
+
+    def attempt(index):
+        try:
+            fix = section_fix(current_code, error, output_file, variant=index)
+            if fix is None:
+                fix = optimizer.optimize_code(xml_parser(llm(whole_file_request(current_code, error), variant=index), "output"))
+            if cancel.is_set():
+                return fix, None, "cancelled"
+
+            candidate_file = output_file.with_name(f"{output_file.stem}_candidate{index}.py")
+            candidate_file.write_text(fix)
+            candidate_error = validate_manim_code(candidate_file, media_dir, cancel=cancel)
+            video = None
+            if candidate_error is None:
+                video, candidate_error = render_video(candidate_file, media_dir, preview=False, cancel=cancel)
+            return fix, video, candidate_error
+        except Exception as e:
+            return None, None, str(e)
+
+    print(f"Requesting {candidates} candidate fixes in parallel")
+    first_failure = None
+    pool = ThreadPoolExecutor(max_workers=candidates)
+    futures = [pool.submit(attempt, index) for index in range(candidates)]
+    with telemetry.span("speculative_repair", candidates=candidates, won=False) as record:
+        try:
+            for future in as_completed(futures):
+                fix, video, candidate_error = future.result()
+                if video and candidate_error is None:
+                    output_file.write_text(fix)
+                    print("Keeping the first candidate that rendered")
+                    record["won"] = True
+                    return video, None
+                if fix is not None and first_failure is None:
+                    first_failure = (fix, candidate_error or "No video file found in media directory")
+        finally:
+            # Losing dry runs and renders are killed in their workers; requests still in flight finish and are dropped
+            cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    if first_failure is None:
+        return None, error
+    fix, candidate_error = first_failure
+    output_file.write_text(fix)
+    return None, candidate_error
+
+def validate_manim_code(output_file, media_dir=None, cancel=None):
+    """Checks that run before paying for a render, returns an error message or None"""
+    with open(output_file, 'r') as f:
+        code = f.read()
+
+    with telemetry.span("preflight") as record:
+        errors = preflight.check(code)
+        record["ok"] = not errors
+    if errors:
+        return preflight.format_errors(errors)
+
+    # Fills the Tex cache the render will read from and surfaces every LaTeX error at once
+    failures = tex_precompile.precompile(code, Path(media_dir or "media") / "Tex")
+    if failures:
+        return tex_precompile.format_failures(failures)
+
+    # Runs construct with animations skipped, so runtime errors surface before any frame is encoded
+    if dry_run.enabled():
+        with telemetry.span("dry_run") as record:
+            error = dry_run.check(output_file, media_dir=media_dir, cancel=cancel)
+            record["ok"] = error is None
+        return error
+    return None
+
+def final_render_enabled():
+    """Set FINAL_RENDER=0 to stop at the low quality preview"""
+    return os.getenv("FINAL_RENDER", "1") != "0"
+
+def render_final(output_file, media_dir, output_path, quality=FINAL_QUALITY):
+    """Render the accepted code at publishing quality, returns (video path or None, error message or None)"""
+    # Same media dir as the preview, so the Tex and text caches are already warm
+    if sections.enabled():
+        with open(output_file, 'r') as f:
+            can_split = sections.split_sections(f.read()) is not None
+        if can_split:
+            with telemetry.span("final_render", quality=quality, sections=True) as record:
+                video, error = sections.render_sections(output_file, media_dir, quality=quality)
+                if video:
+                    shutil.copy(video, output_path)
+                record["ok"] = video is not None
+            if video:
+                return Path(output_path), None
+            return None, error
+
+    with telemetry.span("final_render", quality=quality) as record:
+        result = render_pool.render(output_file, "FullTutorial", quality, output=output_path, media_dir=media_dir)
+        record["ok"] = result["ok"]
+    if not result["ok"]:
+        return None, render_pool.error_message(result)
+    return Path(result["video"]), None
+
+def queue_final_render(run, output_dir, quality=FINAL_QUALITY, stem=None):
+    """Start the final render in the background, returns a future of (video path, error)"""
+    resolution = sections.QUALITY_DIRS[quality].split("p")[0]
+    output_path = output_dir / f"{stem or 'tutorial_' + run['name']}_{resolution}p.mp4"
+    print(f"Queued {resolution}p render: {output_path}")
+    return final_renders.submit(render_final, run["code_file"], run["media_dir"], output_path, quality)
+
+def run_manim_compilation(run, max_attempts=5):
+    """Run Manim compilation with error handling and automatic fixes inside a workspace"""
     output_dir = create_output_dir()
+    output_file = run["code_file"]
+    media_dir = run["media_dir"]
     attempts = 0
+    candidates = int(os.getenv("REPAIR_CANDIDATES", "1"))
+    result = None
     
-    while attempts < max_attempts:
+    # A repair that already rendered is accepted even if it used the last attempt
+    while attempts < max_attempts or (result is not None and result[1] is None):
         try:
-            result = subprocess.run(
-                ["/opt/homebrew/bin/manim", "-pql", output_file, "FullTutorial"],
-                capture_output=True,
-                text=True
-            )
+            # A speculative repair has already validated and rendered its winner
+            if result is None:
+                error = validate_manim_code(output_file, media_dir)
+                result = render_video(output_file, media_dir) if error is None else (None, error)
+            video, error = result
+            result = None
+            telemetry.event("attempt", number=attempts + 1, ok=error is None)
             
-            if result.returncode == 0:
-                media_dir = Path("media/videos/outputs/480p15")
-                video_files = list(media_dir.glob("*.mp4"))
-                
-                if video_files:
-                    latest_video = max(video_files, key=lambda x: x.stat().st_mtime)
-                    
-                    timestamp = int(time.time())
-                    output_filename = f"tutorial_{timestamp}.mp4"
-                    output_path = output_dir / output_filename
+            if error is None:
+                if video:
+                    output_path = output_dir / f"tutorial_{run['name']}.mp4"
                     
                     # Move the video to output directory
-                    latest_video.rename(output_path)
+                    video.rename(output_path)
                     print(f"Successfully generated video: {output_path}")
-                    return True
+                    break
                 else:
                     print("No video file found in media directory")
                     return False
@@ -130,17 +424,13 @@ def run_manim_compilation(output_file, max_attempts=5):
             # If compilation failed
             else:
                 print(f"Compilation attempt {attempts + 1} failed. Error:")
-                print(result.stderr)
-                
-                with open(output_file, 'r') as f:
-                    current_code = f.read()
+                print(error)
+                workspace.write_log(run, f"attempt_{attempts + 1}.log", error)
                 
-                request = [ {"role": "system", "content": "You are an expert at fixing Manim compilation errors. Fix the code while maintaining its original functionality."},
-                        {"role": "user", "content": f"Here is the Manim code that failed to compile:\n\n{current_code}\n\nError message:\n{result.stderr}\n\nPlease provide the fixed code that will compile successfully. Write your python output in <output></output> tags"}]
-                fixed_code = xml_parser(llm(request),"output")
-                
-                with open(output_file, 'w') as f:
-                    f.write(fixed_code)
+                if candidates > 1:
+                    result = speculative_repair(output_file, error, candidates, media_dir)
+                else:
+                    repair_manim_code(output_file, error)
                 
                 attempts += 1
                 print(f"Attempting fix {attempts}/{max_attempts}")
@@ -148,24 +438,42 @@ def run_manim_compilation(output_file, max_attempts=5):
         except Exception as e:
             print(f"Unexpected error during compilation: {str(e)}")
             attempts += 1
-    
-    print(f"Failed to compile after {max_attempts} attempts")
-    return False
+    else:
+        print(f"Failed to compile after {max_attempts} attempts")
+        return False
+
+    # Outside the retry loop, so nothing here can send an accepted video back for another attempt
+    if final_render_enabled():
+        run["final_render"] = queue_final_render(run, output_dir)
+    return True
 
 def main():
+    run = workspace.create()
+    telemetry.set_report(run["log_dir"] / "run.jsonl")
+    print(f"Working in {run['root']}")
     print("Generating initial Manim code from input screenshots...")
-    generate_initial_manim_code()
+    generate_initial_manim_code(output_file=run["code_file"])
     
-    output_file = "outputs.py"
+    output_file = run["code_file"]
     if not os.path.exists(output_file):
         print(f"Error: {output_file} not found")
         return
     
-    success = run_manim_compilation(output_file)
+    success = run_manim_compilation(run)
     if success:
         print("Manim compilation completed successfully")
     else:
         print("Manim compilation failed after maximum attempts")
 
+    if run.get("final_render"):
+        print("Preview is ready, waiting for the final render...")
+        video, error = run["final_render"].result()
+        if video:
+            print(f"Final render ready: {video}")
+        else:
+            print(f"Final render failed:\n{error}")
+
+    telemetry.print_summary()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,196 @@
+import os
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+
+# Shared media cache for every render location.
+# manim keeps its Tex and text SVGs under the media dir of whatever directory
+# it runs from, so the agent, the workspaces, documentation/ and manim-web/
+# each compiled the same LaTeX and laid out the same text again. install()
+# routes those lookups through one content-addressed root instead:
+#
+#   MEDIA_CACHE_DIR/tex/<hash>.svg          compiled LaTeX, keyed by the full tex source
+#   MEDIA_CACHE_DIR/texts/<hash>.svg        Pango text, keyed by manim's own text hash and frame size
+#   MEDIA_CACHE_DIR/images/<hash>.json      preprocessed screenshots (image_prep)
+#   MEDIA_CACHE_DIR/voiceovers/             manim_voiceover's cache, linked into each media dir
+#
+# Entries are written to a staging file and moved into place with
+# os.replace, so parallel workers never see half-written SVGs. Hits bump the
+# entry's mtime and the tree is trimmed back under MAX_BYTES oldest first.
+
+ROOT = Path(os.getenv("MEDIA_CACHE_DIR", Path(__file__).resolve().parent / ".cache" / "media"))
+MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# Trimming walks the whole tree, so it runs once per this many new entries
+EVICT_EVERY = 50
+# manim_voiceover keeps an index next to its audio files, so they are counted but never evicted
+EVICTABLE = ("tex", "texts", "images")
+
+_stats = {}
+_stored = 0
+_lock = threading.Lock()
+
+
+def enabled():
+    """Set MEDIA_CACHE=0 to let manim use the per-directory media caches"""
+    return os.getenv("MEDIA_CACHE", "1") != "0"
+
+
+def record(kind, hit):
+    with _lock:
+        counts = _stats.setdefault(kind, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+
+def stats(reset=False):
+    """Hit and miss counts per kind since the last reset, as {kind: {"hits", "misses"}}"""
+    global _stats
+    with _lock:
+        current = {kind: dict(counts) for kind, counts in _stats.items()}
+        if reset:
+            _stats = {}
+    return current
+
+
+def lookup(kind, key, suffix):
+    """Path of a cached entry, or None on a miss; a hit marks the entry as recently used"""
+    path = ROOT / kind / f"{key}{suffix}"
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        record(kind, False)
+        return None
+    record(kind, True)
+    return path
+
+
+def store(kind, key, suffix, source):
+    """Copy source into the cache atomically, returns the cached path"""
+    global _stored
+    path = ROOT / kind / f"{key}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    shutil.copyfile(source, staging)
+    os.replace(staging, path)
+
+    with _lock:
+        _stored += 1
+        due = _stored % EVICT_EVERY == 0
+    if due:
+        evict()
+    return path
+
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for path in ROOT.rglob("*"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_file():
+            continue
+        total += stat.st_size
+        if path.relative_to(ROOT).parts[0] in EVICTABLE and not path.name.endswith(".tmp"):
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def size():
+    return sum(path.stat().st_size for path in ROOT.rglob("*") if path.is_file())
+
+
+def link_voiceovers(media_dir):
+    """Point media_dir/voiceovers at the shared voiceover cache, unless it already holds its own"""
+    link = Path(media_dir) / "voiceovers"
+    if link.is_symlink() or link.exists():
+        return
+    target = ROOT / "voiceovers"
+    target.mkdir(parents=True, exist_ok=True)
+    link.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        link.symlink_to(target.resolve(), target_is_directory=True)
+    except FileExistsError:
+        # Another worker linked it first
+        pass
+
+
+def tex_key(template, texcode):
+    """Key of a compiled formula: the full tex source and how it is compiled"""
+    return hashlib.sha256(f"{template.tex_compiler}:{template.output_format}:{texcode}".encode()).hexdigest()
+
+
+def _cached_tex_to_svg_file(original):
+    def tex_to_svg_file(expression, environment=None, tex_template=None):
+        from manim import config
+
+        template = tex_template or config["tex_template"]
+        if environment is not None:
+            source = template.get_texcode_for_expression_in_env(expression, environment)
+        else:
+            source = template.get_texcode_for_expression(expression)
+        key = tex_key(template, source)
+
+        cached = lookup("tex", key, ".svg")
+        if cached is not None:
+            return cached
+        return store("tex", key, ".svg", original(expression, environment, tex_template))
+
+    tex_to_svg_file._media_cache = True
+    return tex_to_svg_file
+
+
+def _cached_text2svg(original):
+    def _text2svg(self, color):
+        from manim import config
+
+        # Pango lays text out on a canvas of the output's pixel size
+        key = f"{type(self).__name__}-{self._text2hash(color)}-{config.pixel_width}x{config.pixel_height}"
+        cached = lookup("texts", key, ".svg")
+        if cached is not None:
+            return str(cached)
+        return str(store("texts", key, ".svg", original(self, color)))
+
+    _text2svg._media_cache = True
+    return _text2svg
+
+
+def install(media_dir=None):
+    """Route manim's Tex and text SVG caches through ROOT, once per process"""
+    if not enabled():
+        return
+    from manim.utils import tex_file_writing
+    from manim.mobject.text import tex_mobject
+    from manim.mobject.text.text_mobject import MarkupText, Text
+
+    if media_dir is not None:
+        link_voiceovers(media_dir)
+    if getattr(tex_file_writing.tex_to_svg_file, "_media_cache", False):
+        return
+
+    # tex_mobject imported the function by name, so both references are replaced
+    cached = _cached_tex_to_svg_file(tex_file_writing.tex_to_svg_file)
+    tex_file_writing.tex_to_svg_file = cached
+    tex_mobject.tex_to_svg_file = cached
+    Text._text2svg = _cached_text2svg(Text._text2svg)
+    MarkupText._text2svg = _cached_text2svg(MarkupText._text2svg)
+    evict()
+
+
+def main():
+    print(f"Media cache at {ROOT}: {size() / 1024 / 1024:.1f} MB of {MAX_BYTES / 1024 / 1024:.0f} MB")
+    evict()
+    print(f"After trimming: {size() / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
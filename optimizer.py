@@ -0,0 +1,374 @@
+import os
+import ast
+
+# Optimizer pass for generated scenes.
+# Generated code often wraps constant geometry in always_redraw, or attaches
+# updaters that put a mobject in the same place on every frame. Both cost a
+# rebuild or a layout pass per frame for the rest of the scene. When the
+# closure only reads values that never change afterwards, and the result is
+# only used in ways an updater couldn't have affected, the call is rewritten
+# to build or place the mobject once:
+#
+#   arrow = always_redraw(lambda: Arrow(axes.c2p(0, 0), axes.c2p(1, 3)))
+#       -> arrow = Arrow(axes.c2p(0, 0), axes.c2p(1, 3))
+#   label.add_updater(lambda m: m.next_to(dot, UP))
+#       -> label.next_to(dot, UP)
+#
+# The analysis is deliberately conservative: any use it doesn't recognise
+# keeps the updater. Source is edited in place, so everything else in the
+# file keeps its formatting.
+
+# Methods that read a mobject (or array) without changing it
+READ_ONLY_METHODS = {
+    "c2p", "coords_to_point", "p2c", "point_to_coords", "i2gp", "input_to_graph_point", "n2p", "number_to_point",
+    "point_to_number", "get_origin", "get_x_axis", "get_y_axis", "get_axes", "plot", "get_graph", "get_area",
+    "get_vertical_line", "get_horizontal_line", "get_lines_to_point", "get_riemann_rectangles", "get_graph_label",
+    "get_center", "get_top", "get_bottom", "get_left", "get_right", "get_corner", "get_critical_point",
+    "get_boundary_point", "get_start", "get_end", "get_x", "get_y", "get_z", "get_width", "get_height",
+    "get_color", "get_value", "get_vector", "get_unit_vector", "get_angle", "get_length", "get_tex_string",
+    "point_from_proportion", "copy", "tolist", "dot", "sum",
+}
+# Calls that only read their mobject or array arguments
+READER_CALLS = {
+    "Arrow", "Vector", "Line", "DashedLine", "DoubleArrow", "Dot", "Brace", "BraceBetweenPoints",
+    "SurroundingRectangle", "BackgroundRectangle", "Underline", "Cross", "Angle", "RightAngle",
+    "abs", "min", "max", "len", "round", "float", "int", "str", "list", "tuple", "print",
+}
+# Animations whose effect on an always_redraw mobject is the same as on a static one:
+# updating is suspended while they run and the geometry they leave behind is unchanged
+RESULT_ANIMATIONS = {
+    "Create", "Uncreate", "Write", "Unwrite", "FadeIn", "FadeOut", "DrawBorderThenFill", "GrowArrow",
+    "GrowFromCenter", "GrowFromPoint", "GrowFromEdge", "SpinInFromNothing", "Indicate", "Circumscribe",
+    "Flash", "FocusOn", "ShowPassingFlash",
+}
+# Animations that leave a mobject's geometry alone, as long as they aren't told to move it
+DEPENDENCY_ANIMATIONS = {"FadeIn", "FadeOut"}
+MOVING_KWARGS = {"shift", "target_position", "scale", "point"}
+TRANSFORMS = {
+    "Transform", "ReplacementTransform", "TransformFromCopy", "ClockwiseTransform", "CounterclockwiseTransform",
+    "FadeTransform", "FadeTransformPieces", "TransformMatchingShapes", "TransformMatchingTex",
+}
+GROUPS = {"VGroup", "Group"}
+SCENE_METHODS = {"add", "remove", "bring_to_front", "bring_to_back", "add_foreground_mobject", "add_foreground_mobjects"}
+# Placing a mobject relative to constant things gives the same result however often it runs
+IDEMPOTENT_METHODS = {"move_to", "next_to", "set_x", "set_y", "set_z", "align_to", "to_edge", "to_corner", "match_x", "match_y"}
+PURE_MODULES = {"np", "numpy", "math"}
+
+
+def enabled():
+    """Set OPTIMIZE_CODE=0 to render generated code exactly as written"""
+    return os.getenv("OPTIMIZE_CODE", "1") != "0"
+
+
+def _call_name(node):
+    if isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name):
+            return node.func.id
+        if isinstance(node.func, ast.Attribute):
+            return node.func.attr
+    return None
+
+
+def _after(node, stmt):
+    return (node.lineno, node.col_offset) > (stmt.end_lineno, stmt.end_col_offset)
+
+
+class Function:
+    """Bindings and uses of names inside one function, for the safety checks"""
+
+    def __init__(self, node, parents, module_names):
+        self.node = node
+        self.parents = parents
+        self.module_names = module_names
+        self.params = {arg.arg for arg in ast.walk(node.args) if isinstance(arg, ast.arg)}
+        self.bindings = {}
+        self.uses = {}
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                if isinstance(child.ctx, ast.Load):
+                    self.uses.setdefault(child.id, []).append(child)
+                else:
+                    self.bindings.setdefault(child.id, []).append(child)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and child is not node:
+                self.bindings.setdefault(child.name, []).append(child)
+            elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                for name in child.names:
+                    self.bindings.setdefault(name, []).append(child)
+
+    def straight_line(self, stmt):
+        """True if stmt runs exactly once per call: directly in the body or in with blocks"""
+        node = stmt
+        while node is not self.node:
+            parent = self.parents[node]
+            if not isinstance(parent, (ast.With, ast.FunctionDef, ast.AsyncFunctionDef)) or node not in parent.body:
+                return False
+            node = parent
+        return True
+
+    def single_binding(self, name, stmt):
+        """The name is assigned once, by a plain statement that runs before stmt"""
+        bindings = self.bindings.get(name, [])
+        if len(bindings) != 1 or name in self.params:
+            return False
+        assign = self.parents.get(bindings[0])
+        return (
+            isinstance(assign, ast.Assign)
+            and len(assign.targets) == 1
+            and assign.targets[0] is bindings[0]
+            and self.straight_line(assign)
+            and (stmt is assign or assign.end_lineno < stmt.lineno)
+        )
+
+    def use_is_safe(self, node, role, stmt):
+        """Whether one load of a name can't change what an updater would have drawn"""
+        parent = self.parents[node]
+        before = not _after(node, stmt)
+
+        # Attribute access: only reading methods, except before the updater existed
+        if isinstance(parent, ast.Attribute) and parent.value is node:
+            if parent.attr in ("animate", "add_updater", "become"):
+                return False
+            call = self.parents.get(parent)
+            if parent.attr in READ_ONLY_METHODS:
+                return True
+            return before and isinstance(call, ast.Call) and call.func is parent
+
+        if isinstance(parent, ast.Subscript) and parent.value is node:
+            return isinstance(parent.ctx, ast.Load)
+        if isinstance(parent, (ast.BinOp, ast.UnaryOp, ast.Compare, ast.FormattedValue)):
+            return True
+        if isinstance(parent, ast.keyword):
+            parent = self.parents[parent]
+        if not isinstance(parent, ast.Call) or node is parent.func:
+            return False
+
+        name = _call_name(parent)
+        if isinstance(parent.func, ast.Attribute) and isinstance(parent.func.value, ast.Name):
+            owner = parent.func.value.id
+            if owner in PURE_MODULES:
+                return "random" not in ast.unparse(parent.func)
+            if owner in self.params and name in SCENE_METHODS:
+                return True
+        if name in READER_CALLS:
+            return True
+        if name in TRANSFORMS:
+            first = parent.args[0] if parent.args else None
+            return node is not first or name == "TransformFromCopy"
+        if name in GROUPS:
+            # A group only stays harmless if it is handed straight to something harmless
+            return self.use_is_safe(parent, role, stmt)
+        if role == "result" and name in RESULT_ANIMATIONS:
+            return True
+        if name in DEPENDENCY_ANIMATIONS and not any(k.arg in MOVING_KWARGS for k in parent.keywords):
+            # Animations suspend updaters, so an unplaced mobject would fade in where it was created
+            return role != "placed" or name == "FadeOut"
+        # Plain helpers like shrink_to_fit(axes) run once, which only matters once the updater exists
+        return before and isinstance(parent.func, ast.Name) and role == "dependency"
+
+    def uses_are_safe(self, name, role, stmt, skip=()):
+        return all(self.use_is_safe(use, role, stmt) for use in self.uses.get(name, []) if use not in skip)
+
+    def constant_closure(self, expr, stmt, own_names=()):
+        """Every name expr reads is fixed from stmt on, and every call in it is side-effect free"""
+        inner = set(ast.walk(expr))
+        for node in inner:
+            if isinstance(node, ast.Call):
+                func = node.func
+                if isinstance(func, ast.Name):
+                    if func.id not in READER_CALLS and not func.id[:1].isupper():
+                        return False
+                    if func.id in TRANSFORMS or func.id in RESULT_ANIMATIONS:
+                        return False
+                elif isinstance(func, ast.Attribute):
+                    if func.attr in ("add_updater", "animate", "become", "set_value", "increment_value"):
+                        return False
+                    root = func.value
+                    while isinstance(root, ast.Attribute):
+                        root = root.value
+                    if isinstance(root, ast.Name) and root.id in PURE_MODULES:
+                        if "random" in ast.unparse(func):
+                            return False
+                    elif isinstance(func.value, ast.Name):
+                        if func.attr not in READ_ONLY_METHODS:
+                            return False
+                    elif not isinstance(func.value, ast.Call):
+                        # Methods chained on a mobject built inside the closure only touch that mobject
+                        return False
+                else:
+                    return False
+
+        for node in inner:
+            if not isinstance(node, ast.Name) or node.id in own_names:
+                continue
+            name = node.id
+            if name in self.params:
+                return False
+            if name in self.bindings:
+                if not self.single_binding(name, stmt):
+                    return False
+                if not self.uses_are_safe(name, "dependency", stmt, skip=inner):
+                    return False
+            elif name in self.module_names:
+                if not self.module_names[name]:
+                    return False
+        return True
+
+
+def module_constants(tree):
+    """Module-level names, mapped to whether they are safe to read from a closure"""
+    names = {}
+    declared_global = {name for node in ast.walk(tree) if isinstance(node, ast.Global) for name in node.names}
+    for stmt in tree.body:
+        if isinstance(stmt, ast.Assign):
+            constant = not any(isinstance(node, ast.Call) for node in ast.walk(stmt.value))
+            for target in stmt.targets:
+                for node in ast.walk(target):
+                    if isinstance(node, ast.Name):
+                        names[node.id] = constant and node.id not in names
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            # Calling a helper from a closure could do anything
+            names[stmt.name] = False
+        elif isinstance(stmt, (ast.AugAssign, ast.AnnAssign)) and isinstance(stmt.target, ast.Name):
+            names[stmt.target.id] = False
+    for name in declared_global:
+        names[name] = False
+    return names
+
+
+def find_rewrites(code):
+    """[(start, end, replacement, description)] as byte offsets into code"""
+    tree = ast.parse(code)
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+    module_names = module_constants(tree)
+    line_starts = [0]
+    for line in code.encode().splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    source = code.encode()
+
+    def span(node):
+        return line_starts[node.lineno - 1] + node.col_offset, line_starts[node.end_lineno - 1] + node.end_col_offset
+
+    def segment(node):
+        start, end = span(node)
+        return source[start:end].decode()
+
+    rewrites = []
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        scope = Function(func, parents, module_names)
+        for stmt in ast.walk(func):
+            if not isinstance(stmt, (ast.Assign, ast.Expr)) or not scope.straight_line(stmt):
+                continue
+            # Statements of nested functions belong to their own scope
+            owner = parents[stmt]
+            while not isinstance(owner, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                owner = parents[owner]
+            if owner is not func:
+                continue
+
+            value = stmt.value
+            if (
+                isinstance(stmt, ast.Assign)
+                and len(stmt.targets) == 1
+                and isinstance(stmt.targets[0], ast.Name)
+                and _call_name(value) == "always_redraw"
+                and isinstance(value.func, ast.Name)
+                and len(value.args) == 1
+                and not value.keywords
+                and isinstance(value.args[0], ast.Lambda)
+                and not value.args[0].args.args
+            ):
+                name = stmt.targets[0].id
+                body = value.args[0].body
+                if (
+                    scope.single_binding(name, stmt)
+                    and scope.uses_are_safe(name, "result", stmt)
+                    and scope.constant_closure(body, stmt)
+                ):
+                    replacement = segment(body)
+                    if "\n" in replacement:
+                        replacement = f"({replacement})"
+                    start, end = span(value)
+                    rewrites.append((start, end, replacement, f"line {stmt.lineno}: always_redraw for '{name}' is constant, built once instead"))
+
+            elif (
+                isinstance(stmt, ast.Expr)
+                and isinstance(value, ast.Call)
+                and isinstance(value.func, ast.Attribute)
+                and value.func.attr == "add_updater"
+                and isinstance(value.func.value, ast.Name)
+                and len(value.args) == 1
+                and not value.keywords
+                and isinstance(value.args[0], ast.Lambda)
+                and len(value.args[0].args.args) == 1
+            ):
+                name = value.func.value.id
+                updater = value.args[0]
+                mob = updater.args.args[0].arg
+                body = updater.body
+                if not (
+                    isinstance(body, ast.Call)
+                    and isinstance(body.func, ast.Attribute)
+                    and isinstance(body.func.value, ast.Name)
+                    and body.func.value.id == mob
+                    and body.func.attr in IDEMPOTENT_METHODS
+                ):
+                    continue
+                arguments = body.args + [k.value for k in body.keywords]
+                if any(isinstance(n, ast.Name) and n.id == mob for arg in arguments for n in ast.walk(arg)):
+                    continue
+                # The placement now happens before the mobject is shown instead of on the first frame
+                # it is on screen, so it has to be added to the scene before anything animates it
+                updater_nodes = set(ast.walk(updater))
+                later = sorted(
+                    (use for use in scope.uses.get(name, []) if _after(use, stmt) and use not in updater_nodes),
+                    key=lambda use: (use.lineno, use.col_offset),
+                )
+                first_call = scope.parents[later[0]] if later else None
+                added_first = (
+                    isinstance(first_call, ast.Call)
+                    and isinstance(first_call.func, ast.Attribute)
+                    and first_call.func.attr == "add"
+                    and isinstance(first_call.func.value, ast.Name)
+                    and first_call.func.value.id in scope.params
+                )
+                if (
+                    added_first
+                    and scope.single_binding(name, stmt)
+                    and all(scope.use_is_safe(use, "placed", stmt) for use in later)
+                    and all(scope.constant_closure(arg, stmt) for arg in arguments)
+                ):
+                    start, end = span(value)
+                    rewrites.append((start, end, name + segment(body)[len(mob):], f"line {stmt.lineno}: updater on '{name}' is constant, placed once instead"))
+    return rewrites
+
+
+def optimize(code):
+    """Return (code, [descriptions]) with constant updaters replaced, or the input if nothing applies"""
+    try:
+        rewrites = find_rewrites(code)
+    except SyntaxError:
+        return code, []
+    if not rewrites:
+        return code, []
+
+    source = code.encode()
+    for start, end, replacement, _ in sorted(rewrites, reverse=True):
+        source = source[:start] + replacement.encode() + source[end:]
+    optimized = source.decode()
+    try:
+        ast.parse(optimized)
+    except SyntaxError:
+        return code, []
+    return optimized, [description for _, _, _, description in sorted(rewrites)]
+
+
+def optimize_code(code):
+    """optimize() with logging, for the agent to run on every generated file"""
+    if not enabled():
+        return code
+    optimized, rewrites = optimize(code)
+    for description in rewrites:
+        print(f"Optimizer: {description}")
+    return optimized
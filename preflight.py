@@ -0,0 +1,137 @@
+import os
+import ast
+import builtins
+import importlib
+import importlib.util
+from functools import lru_cache
+
+# Static checks on generated code before any render process is started.
+# Everything here works on the AST, so a bad generation is rejected in
+# milliseconds and its errors go straight into the repair prompt.
+
+SCENE_NAME = "FullTutorial"
+BANNED_IMPORTS = set(filter(None, os.getenv(
+    "PREFLIGHT_BANNED_IMPORTS", "subprocess,socket,shutil,requests,urllib,http,ctypes,multiprocessing"
+).split(",")))
+
+
+def declared_all(module_name):
+    """A module's literal __all__, read from its source without importing it, or None"""
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+    with open(spec.origin, 'r') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            try:
+                return frozenset(ast.literal_eval(node.value))
+            except ValueError:
+                return None
+    return None
+
+
+@lru_cache(maxsize=None)
+def star_import_names(module_name):
+    """Names pulled in by `from module_name import *`, or None if the module can't be imported"""
+    try:
+        module = importlib.import_module(module_name)
+    except Exception:
+        # Local modules like tutorial_helpers still declare what they export
+        return declared_all(module_name)
+    names = getattr(module, "__all__", None)
+    if names is None:
+        names = [name for name in dir(module) if not name.startswith("_")]
+    return frozenset(names)
+
+
+def bound_names(tree):
+    """Every name the module binds anywhere, regardless of scope"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.Import):
+            names.update(alias.asname or alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names.update(alias.asname or alias.name for alias in node.names if alias.name != "*")
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            names.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            names.add(node.rest)
+    return names
+
+
+def check_imports(tree):
+    errors = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            if module.split(".")[0] in BANNED_IMPORTS:
+                errors.append(f"line {node.lineno}: import of '{module}' is not allowed in generated tutorials")
+    return errors
+
+
+def check_scene(tree, scene_name=SCENE_NAME):
+    scene = next((node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == scene_name), None)
+    if scene is None:
+        return [f"no top-level class named '{scene_name}' is defined"]
+    if not scene.bases:
+        return [f"line {scene.lineno}: class '{scene_name}' must subclass a manim Scene"]
+
+    construct = next((node for node in scene.body if isinstance(node, ast.FunctionDef) and node.name == "construct"), None)
+    if construct is None:
+        return [f"line {scene.lineno}: class '{scene_name}' has no construct(self) method"]
+    if not construct.args.args:
+        return [f"line {construct.lineno}: {scene_name}.construct must take self"]
+    return []
+
+
+def check_names(tree):
+    known = bound_names(tree) | set(dir(builtins)) | {"__name__", "__file__"}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            names = star_import_names(node.module)
+            if names is None:
+                # Can't know what the star import provides, so don't guess
+                return []
+            known |= names
+
+    errors = []
+    reported = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known and node.id not in reported:
+            reported.add(node.id)
+            errors.append(f"line {node.lineno}: name '{node.id}' is not defined")
+    return errors
+
+
+def check(code, scene_name=SCENE_NAME):
+    """Return a list of problems found in the generated code, empty if it looks renderable"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [f"line {e.lineno}: SyntaxError: {e.msg}\n    {(e.text or '').strip()}"]
+
+    return check_imports(tree) + check_scene(tree, scene_name) + check_names(tree)
+
+
+def format_errors(errors):
+    """Render preflight problems the way the repair prompt expects an error message"""
+    return "Static checks failed before rendering:\n" + "\n".join(f"- {error}" for error in errors)
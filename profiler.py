@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+from contextlib import contextmanager
+
+# Per-animation cost profiler for generated scenes.
+# Scene.play and Scene.wait are wrapped so every call records its wall time,
+# the frames it produced, the time spent running updaters and the number of
+# mobjects on screen, together with the line of scene code that made it.
+# The results come out as a table sorted by cost and as folded stacks
+# (construct;play_column_picture;L150 play(Create) <microseconds>) that
+# flamegraph.pl, speedscope or inferno can draw.
+#
+#   python profiler.py outputs.py FullTutorial --folded profile.folded
+#   PROFILE_RENDER=1 makes the render workers write both next to the run's logs
+
+MANIM_DIR = None
+_stack = []
+_records = None
+
+
+def enabled():
+    """Set PROFILE_RENDER=1 to profile every render"""
+    return os.getenv("PROFILE_RENDER", "0") == "1"
+
+
+def call_site():
+    """Scene code frames calling into manim, outermost first, as [(file, line, function)]"""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(MANIM_DIR) and filename != __file__ and "<frozen" not in filename:
+            frames.append((filename, frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    # Only the frames up to the scene's construct matter
+    frames.reverse()
+    start = next((index for index, (_, _, name) in enumerate(frames) if name == "construct"), 0)
+    return frames[start:]
+
+
+def describe(args):
+    names = []
+    for arg in args:
+        # .animate builders show up as _AnimationBuilder; their name is the method being animated
+        name = type(arg).__name__
+        names.append("animate" if name == "_AnimationBuilder" else name)
+    return ", ".join(names) or "nothing"
+
+
+def _wrap_call(original, kind):
+    def wrapper(self, *args, **kwargs):
+        # wait() is built on play(); only the outer call is recorded
+        if _records is None or _stack:
+            return original(self, *args, **kwargs)
+
+        stack = call_site()
+        record = {
+            "kind": kind,
+            "label": f"wait({args[0] if args else kwargs.get('duration', 1.0)})" if kind == "wait" else f"play({describe(args)})",
+            "file": stack[-1][0] if stack else "?",
+            "line": stack[-1][1] if stack else 0,
+            "stack": [name for _, _, name in stack],
+            "frames": 0,
+            "updaters": 0.0,
+        }
+        _stack.append(record)
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            record["time"] = time.perf_counter() - started
+            record["mobjects"] = len(self.mobjects)
+            record["family"] = len(self.get_mobject_family_members())
+            _stack.pop()
+            _records.append(record)
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def install():
+    """Patch manim once; nothing is recorded outside profile()"""
+    global MANIM_DIR
+    import manim
+    from manim.scene.scene import Scene
+    from manim.renderer.cairo_renderer import CairoRenderer
+
+    if getattr(Scene.play, "_profiled", False):
+        return
+    MANIM_DIR = str(Path(manim.__file__).resolve().parent)
+
+    Scene.play = _wrap_call(Scene.play, "play")
+    Scene.wait = _wrap_call(Scene.wait, "wait")
+
+    update_mobjects = Scene.update_mobjects
+
+    def timed_update_mobjects(self, dt):
+        started = time.perf_counter()
+        try:
+            return update_mobjects(self, dt)
+        finally:
+            if _stack:
+                _stack[-1]["updaters"] += time.perf_counter() - started
+
+    Scene.update_mobjects = timed_update_mobjects
+
+    add_frame = CairoRenderer.add_frame
+
+    def counted_add_frame(self, frame, num_frames=1):
+        if _stack and not self.skip_animations:
+            _stack[-1]["frames"] += num_frames
+        return add_frame(self, frame, num_frames)
+
+    CairoRenderer.add_frame = counted_add_frame
+
+
+@contextmanager
+def profile():
+    """Collect one record per play/wait call made inside the block"""
+    global _records
+    install()
+    _records = records = []
+    try:
+        yield records
+    finally:
+        _records = None
+
+
+def report(records, top=None):
+    """Calls grouped by source line, most expensive first"""
+    lines = {}
+    for record in records:
+        entry = lines.setdefault((record["file"], record["line"]), {
+            "label": record["label"], "function": record["stack"][-1] if record["stack"] else "?",
+            "calls": 0, "time": 0.0, "frames": 0, "updaters": 0.0, "mobjects": 0, "family": 0,
+        })
+        entry["calls"] += 1
+        entry["time"] += record["time"]
+        entry["frames"] += record["frames"]
+        entry["updaters"] += record["updaters"]
+        entry["mobjects"] = max(entry["mobjects"], record["mobjects"])
+        entry["family"] = max(entry["family"], record["family"])
+
+    total = sum(record["time"] for record in records) or 1.0
+    rows = sorted(lines.items(), key=lambda item: -item[1]["time"])[:top]
+    out = [f"{'time s':>8}{'%':>6}{'frames':>8}{'ms/frame':>10}{'updaters s':>12}{'mobjects':>10}  line"]
+    for (filename, line), entry in rows:
+        per_frame = entry["time"] / entry["frames"] * 1000 if entry["frames"] else 0.0
+        out.append(
+            f"{entry['time']:>8.2f}{entry['time'] / total * 100:>6.1f}{entry['frames']:>8}{per_frame:>10.1f}"
+            f"{entry['updaters']:>12.2f}{entry['family']:>10}  {Path(filename).name}:{line} {entry['function']} {entry['label']}"
+        )
+    out.append(f"{total:>8.2f} total over {len(records)} calls")
+    return "\n".join(out)
+
+
+def folded(records):
+    """Folded stacks with microseconds as the sample count"""
+    stacks = {}
+    for record in records:
+        key = ";".join(record["stack"] + [f"L{record['line']} {record['label']}".replace(";", ",")])
+        stacks[key] = stacks.get(key, 0) + int(record["time"] * 1_000_000)
+    return "".join(f"{stack} {value}\n" for stack, value in stacks.items())
+
+
+def write(records, out_dir, stem):
+    """Save the report and the folded stacks, returns their paths"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report_path = out_dir / f"{stem}.profile.txt"
+    folded_path = out_dir / f"{stem}.folded"
+    report_path.write_text(report(records) + "\n")
+    folded_path.write_text(folded(records))
+    return report_path, folded_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the play/wait calls of a manim scene")
+    parser.add_argument("code_file")
+    parser.add_argument("scene", nargs="?", default="FullTutorial")
+    parser.add_argument("-q", "--quality", choices=["l", "m", "h"], default="l")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--folded", help="Write folded stacks for a flamegraph to this file")
+    args = parser.parse_args()
+
+    from manim import tempconfig
+    from manim.constants import QUALITIES
+
+    code_file = Path(args.code_file).resolve()
+    sys.path.insert(0, str(code_file.parent))
+    spec = importlib.util.spec_from_file_location(code_file.stem, code_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    quality = {"l": "low_quality", "m": "medium_quality", "h": "high_quality"}[args.quality]
+    with profile() as records, tempconfig({**QUALITIES[quality], "input_file": str(code_file)}):
+        getattr(module, args.scene)().render()
+
+    print(report(records, args.top))
+    if args.folded:
+        Path(args.folded).write_text(folded(records))
+        print(f"Folded stacks: {args.folded}")
+
+
+if __name__ == "__main__":
+    main()
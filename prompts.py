@@ -1,16 +1,12 @@
 import anthropic
 import os
-import base64
 from pathlib import Path
 from dotenv import load_dotenv
+from image_prep import prepare_images
 
 load_dotenv()
 client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_KEY"))
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
-
 def llm(prompt_chain):
     response = client.chat.completions.create(
         model="claude-3-7-sonnet-20250219",
@@ -47,26 +43,26 @@ for in_file in in_files:
         
         prompt_chain.append({"role": "user", "content": input_text})
         prompt_chain.append({"role": "assistant", "content": output_text})
-        
-        image_files = sorted([f for f in inputs_dir.glob("*.png")])
-        if image_files:
-            image_contents = []
-            for img_file in image_files:
-                base64_image = encode_image(img_file)
-                image_contents.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/png;base64,{base64_image}"
-                    }
-                })
-            
-            prompt_chain.append({
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Based on these instructions and previous examples, generate a valid Manim tutorial using the content in these screenshots. Only include valid Python code as the output that can be compiled into manim (with accurate LaTeX), with no extra text:"},
-                    *image_contents
-                ]
-            })
+
+# Screenshots are preprocessed and encoded once, after the examples
+image_files = sorted([f for f in inputs_dir.glob("*.png")])
+if image_files:
+    image_contents = []
+    for image in prepare_images(image_files):
+        image_contents.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{image['media_type']};base64,{image['data']}"
+            }
+        })
+    
+    prompt_chain.append({
+        "role": "user",
+        "content": [
+            {"type": "text", "text": "Based on these instructions and previous examples, generate a valid Manim tutorial using the content in these screenshots. Only include valid Python code as the output that can be compiled into manim (with accurate LaTeX), with no extra text:"},
+            *image_contents
+        ]
+    })
 
 output = llm(prompt_chain=prompt_chain)
 # print(prompt_chain)
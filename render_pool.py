@@ -0,0 +1,308 @@
+import os
+import sys
+import shutil
+import subprocess
+import atexit
+import threading
+import traceback
+import multiprocessing
+from pathlib import Path
+from contextlib import nullcontext
+
+import profiler
+import telemetry
+import media_cache
+
+# Warm render workers.
+# A pool of long-lived processes that import manim once and then render
+# jobs in-process, so an attempt no longer pays for starting python and
+# loading manim, cairo and pango. A job is (code, scene, quality, output
+# path); it comes back as {"ok": True, "video": path} or a structured error
+# with the traceback. Workers are replaced after MAX_JOBS_PER_WORKER jobs so
+# whatever manim keeps around between scenes can't grow without bound.
+#
+# The workers are plain processes owned by this module, each talking to the
+# parent over its own pipe and running one job at a time. A job that is
+# cancelled or runs out of time is stopped by killing its worker: nothing
+# else shares that pipe, so nothing else is left half-written, and the next
+# job starts a fresh worker in its place. (multiprocessing.Pool workers share
+# the task and result queues, and killing one can wedge the whole pool.)
+
+POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", "0")) or os.cpu_count()
+MAX_JOBS_PER_WORKER = int(os.getenv("RENDER_WORKER_MAX_JOBS", "20"))
+QUALITIES = {
+    "l": "low_quality",
+    "m": "medium_quality",
+    "h": "high_quality",
+    "p": "production_quality",
+    "k": "fourk_quality",
+}
+
+# Generated code imports tutorial_helpers from here, wherever its own file lives
+ROOT = str(Path(__file__).resolve().parent)
+
+# Sent by a worker once it has imported manim and can take jobs
+READY = "ready"
+
+# Every live worker, and the ones waiting for a job
+_workers = set()
+_idle = []
+_slots = threading.Condition()
+_atexit_registered = False
+
+
+def _init_worker():
+    """Pay for the manim import once per worker instead of once per render"""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    try:
+        import manim  # noqa: F401
+        import tutorial_helpers  # noqa: F401
+        import dry_run
+        import tex_precompile
+    except ImportError:
+        # Let the jobs report it instead of failing every worker at start
+        return
+    dry_run.install()
+    tex_precompile.install()
+
+
+def _load_scene(code, code_file, scene_name):
+    # Compiled under code_file's name so tracebacks point at the lines the repair loop knows
+    module_name = f"_render_job_{Path(code_file).stem}_{os.getpid()}"
+    module = type(sys)(module_name)
+    module.__file__ = str(code_file)
+    sys.modules[module_name] = module
+    try:
+        exec(compile(code, str(code_file), "exec"), module.__dict__)
+    finally:
+        sys.modules.pop(module_name, None)
+    return getattr(module, scene_name)
+
+
+def render_job(job):
+    """Runs in a worker: render one scene, returns {"ok", "video"} or {"ok", "error", "traceback"}"""
+    result = _render(job)
+    # Counted per job so the parent can put them in the run report
+    result["media_cache"] = media_cache.stats(reset=True)
+    return result
+
+
+def _render(job):
+    try:
+        from manim import tempconfig
+        from manim.constants import QUALITIES as MANIM_QUALITIES
+    except ImportError as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+
+    code_file = Path(job["code_file"]).resolve()
+    code = job.get("code")
+    if code is None:
+        code = code_file.read_text()
+
+    # tempconfig only restores plain options, so quality is set through its dimensions
+    options = {
+        **MANIM_QUALITIES[QUALITIES[job.get("quality", "l")]],
+        "media_dir": str(Path(job.get("media_dir") or "media").resolve()),
+        "input_file": str(code_file),
+        # manim's preview shells out to a viewer, which fails in a headless worker after the video is written
+        "preview": False,
+        "dry_run": job.get("dry_run", False),
+        "verbosity": "WARNING",
+    }
+    if job.get("dry_run"):
+        options.update(disable_caching=True, write_to_movie=False, save_last_frame=False)
+
+    profiling = profiler.enabled() and not job.get("dry_run")
+    records = []
+    try:
+        media_cache.install(options["media_dir"])
+        with tempconfig(options), (profiler.profile() if profiling else nullcontext(records)) as records:
+            scene = _load_scene(code, code_file, job["scene"])()
+            scene.render()
+            if job.get("dry_run"):
+                return {"ok": True, "video": None}
+            video = Path(scene.renderer.file_writer.movie_file_path)
+    except BaseException as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    finally:
+        if profiling and records:
+            # Workspaces keep logs next to the code; anywhere else the profile sits beside the file
+            log_dir = code_file.parent / "logs" if (code_file.parent / "logs").is_dir() else code_file.parent
+            profiler.write(records, log_dir, f"{code_file.stem}.{job['scene']}.{job.get('quality', 'l')}")
+
+    if not video.exists():
+        return {"ok": False, "error": "manim finished without writing a video", "traceback": ""}
+    output = job.get("output")
+    if output and Path(output).resolve() != video:
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # Section clips are cached by existing at their path, so a worker killed mid-copy
+        # must leave nothing there: copy next to it and move it into place in one step
+        staging = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+        shutil.copyfile(video, staging)
+        os.replace(staging, output)
+        video = output
+    return {"ok": True, "video": str(video)}
+
+
+def _serve(conn):
+    """Worker process: render the jobs that arrive on conn until the parent closes it"""
+    _init_worker()
+    conn.send(READY)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        conn.send(render_job(job))
+
+
+class Worker:
+    """One warm render process and the parent's end of its pipe"""
+
+    def __init__(self):
+        # spawn keeps workers clean of the parent's threads and open clients
+        context = multiprocessing.get_context("spawn")
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.jobs = 0
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _acquire(cancel=None):
+    """An idle worker, or a new one while there are fewer than POOL_SIZE; None if cancelled while waiting"""
+    global _atexit_registered
+    with _slots:
+        while not _idle and len(_workers) >= POOL_SIZE:
+            if cancelled(cancel):
+                return None
+            _slots.wait(0.5)
+        if _idle:
+            return _idle.pop()
+        worker = Worker()
+        _workers.add(worker)
+        if not _atexit_registered:
+            atexit.register(shutdown)
+            _atexit_registered = True
+        return worker
+
+
+def _release(worker, reuse):
+    """Hand the worker to the next job, or kill it if it was stopped mid-job, died or is used up"""
+    with _slots:
+        reuse = reuse and worker in _workers and worker.jobs < MAX_JOBS_PER_WORKER
+        if reuse:
+            _idle.append(worker)
+        else:
+            _workers.discard(worker)
+        _slots.notify()
+    if not reuse:
+        worker.kill()
+
+
+def _run(worker, job, cancel=None, timeout=None):
+    """Send job to worker and wait for its result; the worker is only reused if the job finished"""
+    finished = False
+    try:
+        worker.conn.send(job)
+        waited = 0.0
+        while True:
+            if cancelled(cancel):
+                return {"ok": False, "error": "cancelled", "traceback": "cancelled"}
+            if timeout is not None and waited >= timeout:
+                # A hung job would hold its worker forever and every later render would queue behind it
+                return {"ok": False, "error": "timeout", "traceback": f"Render of {job['scene']} did not finish within {timeout}s"}
+            if not worker.conn.poll(0.5):
+                # Time a fresh worker spends importing manim doesn't count
+                if worker.ready:
+                    waited += 0.5
+                continue
+            message = worker.conn.recv()
+            if message == READY:
+                worker.ready = True
+                continue
+            worker.jobs += 1
+            finished = True
+            return message
+    except (EOFError, OSError):
+        # Crashed, or killed by shutdown()
+        worker.process.join(1)
+        error = f"Render worker exited with code {worker.process.exitcode}"
+        return {"ok": False, "error": error, "traceback": error}
+    finally:
+        _release(worker, finished)
+
+
+def shutdown():
+    """Kill every worker; jobs still running return an error"""
+    with _slots:
+        workers = list(_workers)
+        _workers.clear()
+        _idle.clear()
+        _slots.notify_all()
+    for worker in workers:
+        worker.kill()
+
+
+def open_file(path):
+    """Show a finished video in the system viewer; a missing viewer or display is not an error"""
+    try:
+        if sys.platform == "darwin":
+            subprocess.Popen(["open", str(path)])
+        elif os.name == "nt":
+            os.startfile(str(path))
+        else:
+            subprocess.Popen(["xdg-open", str(path)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"Could not open {path}: {e}")
+
+
+def cancelled(cancel):
+    """cancel is None, an Event, or a tuple of Events any of which stops the job"""
+    if cancel is None:
+        return False
+    if isinstance(cancel, tuple):
+        return any(event is not None and event.is_set() for event in cancel)
+    return cancel.is_set()
+
+
+def render(code_file, scene, quality="l", output=None, media_dir=None, code=None, preview=False, dry_run=False, cancel=None, timeout=None):
+    """Render in a warm worker and wait for the result; the job is killed if cancel is set or timeout runs out"""
+    job = {
+        "code_file": str(code_file),
+        "code": code,
+        "scene": scene,
+        "quality": quality,
+        "output": str(output) if output else None,
+        "media_dir": str(media_dir) if media_dir else None,
+        "dry_run": dry_run,
+    }
+    # Time spent waiting for a free worker doesn't count towards timeout
+    worker = _acquire(cancel)
+    if worker is None:
+        return {"ok": False, "error": "cancelled", "traceback": "cancelled"}
+    result = _run(worker, job, cancel, timeout)
+    if preview and result["ok"] and result["video"]:
+        open_file(result["video"])
+    counts = result.get("media_cache")
+    if counts:
+        telemetry.event(
+            "media_cache", scene=scene,
+            media_hits=sum(kind["hits"] for kind in counts.values()),
+            media_misses=sum(kind["misses"] for kind in counts.values()),
+            kinds=counts,
+        )
+    return result
+
+
+def error_message(result):
+    """The text the repair loop gets for a failed job"""
+    return result.get("traceback") or result.get("error") or "Render failed"
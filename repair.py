@@ -0,0 +1,145 @@
+import re
+import ast
+import textwrap
+from pathlib import Path
+
+# Section-scoped repairs.
+# Instead of resending the whole file, the error is mapped to the play_*
+# function or class method it came from, only that unit and the error tail go
+# to the model, and the returned unit is spliced back into the file.
+
+FRAME_PATTERNS = [
+    # Plain Python tracebacks
+    re.compile(r'File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<func>[\w<>]+)'),
+    # Rich tracebacks printed by manim
+    re.compile(r'(?P<file>[^\s│"]+\.py):(?P<line>\d+) in (?P<func>[\w<>]+)'),
+]
+# "line N: ..." lines from preflight and tex_precompile
+CHECK_PATTERN = re.compile(r"^- line (?P<line>\d+):", re.MULTILINE)
+ERROR_TAIL_LINES = 30
+
+
+def error_lines(error, code_file, code=None):
+    """Line numbers in code_file mentioned by the error, innermost traceback frame last"""
+    stem = re.escape(Path(code_file).stem)
+    # Frames from repair candidates and section scene files (e.g. tutorial_candidate1_sections.py) count too
+    names = re.compile(rf"{stem}(_candidate\d+)?(?P<sections>_sections)?\.py")
+    length = len(code.splitlines()) if code is not None else None
+
+    lines = []
+    for pattern in FRAME_PATTERNS:
+        for match in pattern.finditer(error):
+            name = names.fullmatch(Path(match.group("file")).name)
+            if not name:
+                continue
+            line = int(match.group("line"))
+            # A section scenes file is the code unchanged with one scene class per section
+            # appended, so its lines map one to one and the appended classes map to nothing
+            if name.group("sections") and length is not None and line > length:
+                continue
+            lines.append(line)
+        if lines:
+            return lines
+    return [int(match.group("line")) for match in CHECK_PATTERN.finditer(error)]
+
+
+def units(tree):
+    """Top-level functions and class methods, as (qualified name, node)"""
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield node.name, node
+        elif isinstance(node, ast.ClassDef):
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    yield f"{node.name}.{child.name}", child
+
+
+def locate(code, error, code_file):
+    """Find the single function or method the error points at, or None to repair the whole file"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    lines = error_lines(error, code_file, code)
+    if not lines:
+        return None
+
+    spans = []
+    for name, node in units(tree):
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        spans.append((name, node, start, node.end_lineno))
+
+    def unit_at(lineno):
+        return next((span for span in spans if span[2] <= lineno <= span[3]), None)
+
+    if CHECK_PATTERN.search(error):
+        # Static check failures must all sit in the same unit
+        found = {unit_at(lineno) for lineno in lines}
+        if len(found) != 1 or None in found:
+            return None
+        span = found.pop()
+    else:
+        # Innermost frame of the traceback that lands in a function of the file
+        span = next((unit_at(lineno) for lineno in reversed(lines) if unit_at(lineno)), None)
+        if span is None:
+            return None
+
+    name, node, start, end = span
+    source_lines = code.splitlines()[start - 1:end]
+    return {
+        "name": name,
+        "function": node.name,
+        "start": start,
+        "end": end,
+        "indent": node.col_offset,
+        "source": textwrap.dedent("\n".join(source_lines)),
+    }
+
+
+def outline(code):
+    """Signatures of the file's functions and classes, so the model knows what it can call"""
+    tree = ast.parse(code)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lines.append(f"def {node.name}({ast.unparse(node.args)})")
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            lines.append(f"class {node.name}({bases})")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.Import, ast.ImportFrom)):
+            lines.append(ast.unparse(node).splitlines()[0])
+    return "\n".join(lines)
+
+
+def section_request(code, unit, error):
+    """Prompt chain asking for a fixed version of just this unit"""
+    error_tail = "\n".join(error.strip().splitlines()[-ERROR_TAIL_LINES:])
+    return [
+        {"role": "system", "content": "You are an expert at fixing Manim compilation errors. You are given one function from a larger Manim file and the error it caused. Fix the function while maintaining its original functionality."},
+        {"role": "user", "content": f"The rest of the file defines:\n\n{outline(code)}\n\nThis is `{unit['name']}`:\n\n{unit['source']}\n\nError message:\n{error_tail}\n\nRewrite only `{unit['name']}`, keeping its name and signature. Write your python output in <output></output> tags"},
+    ]
+
+
+def splice(code, unit, fix):
+    """Replace the unit in code with the fixed definition, or None if the fix doesn't fit"""
+    try:
+        fix_tree = ast.parse(textwrap.dedent(fix))
+    except SyntaxError:
+        return None
+
+    node = next((n for n in fix_tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.name == unit["function"]), None)
+    if node is None:
+        return None
+
+    fix_lines = textwrap.dedent(fix).splitlines()
+    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+    new_unit = textwrap.indent("\n".join(fix_lines[start - 1:node.end_lineno]), " " * unit["indent"])
+
+    lines = code.splitlines()
+    patched = "\n".join(lines[:unit["start"] - 1] + new_unit.splitlines() + lines[unit["end"]:]) + "\n"
+    try:
+        ast.parse(patched)
+    except SyntaxError:
+        return None
+    return patched
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+
+from anthropic.types import Message
+
+# Replay LLM backend.
+# Serves recorded responses in order from a JSONL file through the same
+# client.messages.create / client.messages.stream calls the Anthropic client
+# has, so the agent and documentation/api.py run offline and repeatably.
+# Select it with LLM_BACKEND=replay and LLM_REPLAY_FILE=<responses.jsonl>.
+#
+# One response per line, any of:
+#   {"text": "..."}                                  a plain text answer
+#   {"output_file": "code.py", "wrap": "output"}     file contents in <output> tags
+#                                                    ("python" for a ```python block, "none" as is)
+#   {"output_file": "...", "replace": [["a", "b"]]}  the file with edits applied first
+#   {"content": [{"type": "tool_use", ...}, ...]}    raw content blocks
+# plus optional "usage" (token counts) and "latency" (seconds to wait before answering).
+# Relative paths are resolved against the responses file.
+
+
+def enabled():
+    return os.getenv("LLM_BACKEND", "anthropic") == "replay"
+
+
+def load_responses(path):
+    path = Path(path)
+    with open(path, 'r') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return [dict(entry, base_dir=path.parent) for entry in entries]
+
+
+def entry_content(entry):
+    """Content blocks for one recorded response"""
+    if "content" in entry:
+        return [dict(block, id=block.get("id") or f"toolu_{uuid.uuid4().hex[:24]}") if block["type"] == "tool_use" else block
+                for block in entry["content"]]
+    if "output_file" in entry:
+        text = (entry["base_dir"] / entry["output_file"]).read_text()
+        for old, new in entry.get("replace", []):
+            if old not in text:
+                raise ValueError(f"replay edit {old!r} not found in {entry['output_file']}")
+            text = text.replace(old, new, 1)
+        wrap = entry.get("wrap", "output")
+        if wrap == "output":
+            text = f"<output>\n{text}\n</output>"
+        elif wrap == "python":
+            text = f"```python\n{text}\n```"
+        return [{"type": "text", "text": text}]
+    return [{"type": "text", "text": entry["text"]}]
+
+
+class ReplayStream:
+    """Stand-in for the MessageStream the Anthropic client returns"""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        for block in self.message.content:
+            if block.type == "text":
+                # Arrive in small deltas like a real stream would
+                for start in range(0, len(block.text), 64):
+                    yield block.text[start:start + 64]
+
+    def get_final_message(self):
+        return self.message
+
+
+class ReplayMessages:
+    def __init__(self, responses):
+        self.responses = responses
+        self.position = 0
+        self.lock = threading.Lock()
+
+    def create(self, model=None, messages=(), system=None, **params):
+        with self.lock:
+            if self.position >= len(self.responses):
+                raise RuntimeError(f"Replay exhausted after {len(self.responses)} responses")
+            entry = self.responses[self.position]
+            self.position += 1
+
+        time.sleep(entry.get("latency", 0))
+        content = entry_content(entry)
+        # Rough token counts unless the recording has real ones
+        prompt_chars = len(json.dumps([system, list(messages)], default=str))
+        usage = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": sum(len(block.get("text", "")) for block in content) // 4,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            **entry.get("usage", {}),
+        }
+        return Message.model_validate({
+            "id": f"msg_replay_{self.position}",
+            "type": "message",
+            "role": "assistant",
+            "model": model or "replay",
+            "content": content,
+            "stop_reason": "tool_use" if any(block["type"] == "tool_use" for block in content) else "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        })
+
+    def stream(self, **params):
+        return ReplayStream(self.create(**params))
+
+
+class ReplayClient:
+    """Drop-in for anthropic.Anthropic() that answers from a recording"""
+
+    def __init__(self, path=None):
+        self.messages = ReplayMessages(load_responses(path or os.getenv("LLM_REPLAY_FILE", "responses.jsonl")))
@@ -0,0 +1,174 @@
+import os
+import ast
+import hashlib
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import render_pool
+import telemetry
+
+# Section-parallel rendering.
+# Generated tutorials call a sequence of play_*(self) functions from
+# FullTutorial.construct. Each of those becomes its own scene, the scenes are
+# rendered in parallel, and the clips are joined with ffmpeg's concat demuxer
+# without re-encoding. Clips are cached by a hash of the code they depend on,
+# so after a repair only the sections whose code changed are rendered again.
+#
+# A section scene starts from a fresh Scene, so anything construct carried
+# from one section to the next is gone. When any section fails, the sections
+# still rendering are killed and the whole scene is rendered in one piece;
+# only that render's error is reported.
+
+SCENE_NAME = "FullTutorial"
+QUALITY_DIRS = {"l": "480p15", "m": "720p30", "h": "1080p60", "p": "1440p60", "k": "2160p60"}
+
+
+def enabled():
+    """Set RENDER_SECTIONS=1 to render sections in parallel"""
+    return os.getenv("RENDER_SECTIONS", "0") == "1"
+
+
+def split_sections(code, scene_name=SCENE_NAME):
+    """Return [(function name, cache key)] if construct only calls top-level functions with self, else None"""
+    tree = ast.parse(code)
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    scene = next((node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == scene_name), None)
+    if scene is None:
+        return None
+    construct = next((node for node in scene.body if isinstance(node, ast.FunctionDef) and node.name == "construct"), None)
+    if construct is None or not construct.args.args:
+        return None
+
+    self_name = construct.args.args[0].arg
+    names = []
+    for stmt in construct.body:
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+            continue
+        call = stmt.value if isinstance(stmt, ast.Expr) else None
+        if not (
+            isinstance(call, ast.Call)
+            and isinstance(call.func, ast.Name)
+            and call.func.id in functions
+            and len(call.args) == 1
+            and isinstance(call.args[0], ast.Name)
+            and call.args[0].id == self_name
+            and not call.keywords
+        ):
+            return None
+        names.append(call.func.id)
+
+    if len(names) < 2:
+        return None
+
+    # Everything that isn't a section function is shared by every section, except the
+    # call order in construct, so adding or reordering sections keeps the other clips
+    section_nodes = {functions[name] for name in names}
+    shared = [ast.get_source_segment(code, node) or "" for node in tree.body if node not in section_nodes and node is not scene]
+    shared += [ast.unparse(base) for base in scene.bases]
+    shared += [ast.get_source_segment(code, node) or "" for node in scene.body if node is not construct]
+    shared = "\n".join(shared)
+
+    sections = []
+    for name in names:
+        node = functions[name]
+        used = {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+        # Sections that call other sections depend on their code too
+        sources = [ast.get_source_segment(code, functions[other]) for other in sorted(used & set(names))]
+        digest = hashlib.sha256("\n".join([shared, ast.get_source_segment(code, node), *sources]).encode()).hexdigest()
+        sections.append((name, digest[:16]))
+    return sections
+
+
+def section_scene_code(code, sections, scene_name=SCENE_NAME):
+    """Append one scene per section; the original code keeps its line numbers for tracebacks"""
+    classes = []
+    for index, (name, _) in enumerate(sections):
+        classes.append(f"class {scene_name}Section{index}({scene_name}):\n    def construct(self):\n        {name}(self)\n")
+    return code.rstrip() + "\n\n\n" + "\n\n".join(classes)
+
+
+def render_section(code_file, scene, media_dir, quality, clip, cancel=None):
+    """Render one section scene in a warm worker straight to its cache path"""
+    with telemetry.span("render_section", scene=scene, quality=quality) as record:
+        result = render_pool.render(code_file, scene, quality, output=clip, media_dir=media_dir, cancel=cancel)
+        record["ok"] = result["ok"]
+    if result["ok"]:
+        return Path(result["video"]), None
+    return None, render_pool.error_message(result)
+
+
+def render_whole(code_file, scene_name, media_dir, quality, output_path, cancel=None):
+    """Render the scene in one piece after a section failed, returns (video path or None, error message)"""
+    print("A section failed to render, rendering the whole scene instead")
+    with telemetry.span("render_whole", quality=quality) as record:
+        result = render_pool.render(code_file, scene_name, quality, output=output_path, media_dir=media_dir, cancel=cancel)
+        record["ok"] = result["ok"]
+    if result["ok"]:
+        return Path(result["video"]), None
+    return None, render_pool.error_message(result)
+
+
+def concat_clips(clips, output_path):
+    """Join clips with identical encoding settings without re-encoding them"""
+    list_file = Path(output_path).with_suffix(".txt")
+    list_file.write_text("".join(f"file '{Path(clip).resolve()}'\n" for clip in clips))
+    with telemetry.span("ffmpeg", clips=len(clips)) as record:
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", str(list_file), "-c", "copy", str(output_path)],
+            capture_output=True,
+            text=True
+        )
+        record["ok"] = result.returncode == 0
+    list_file.unlink(missing_ok=True)
+    return result
+
+
+def render_sections(code_file, media_dir, quality="l", workers=None, scene_name=SCENE_NAME, cancel=None):
+    """Render FullTutorial section by section, returns (video path or None, error message)"""
+    with open(code_file, 'r') as f:
+        code = f.read()
+    sections = split_sections(code, scene_name)
+    if sections is None:
+        return None, f"{scene_name}.construct can't be split into sections"
+
+    media_dir = Path(media_dir)
+    clip_dir = media_dir / "sections" / QUALITY_DIRS[quality]
+    clip_dir.mkdir(parents=True, exist_ok=True)
+    clips = [clip_dir / f"{key}.mp4" for _, key in sections]
+
+    scene_file = Path(code_file).with_name(f"{Path(code_file).stem}_sections.py")
+    scene_file.write_text(section_scene_code(code, sections, scene_name))
+
+    todo = [index for index, clip in enumerate(clips) if not clip.exists()]
+    print(f"Rendering {len(todo)}/{len(sections)} sections, {len(sections) - len(todo)} unchanged")
+
+    # Threads only wait on the render pool, which bounds how many scenes render at once
+    workers = workers or int(os.getenv("RENDER_WORKERS", "0")) or render_pool.POOL_SIZE
+    failed = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = [
+        pool.submit(render_section, scene_file, f"{scene_name}Section{index}", media_dir, quality, clips[index], (cancel, failed))
+        for index in todo
+    ]
+    try:
+        for future in as_completed(futures):
+            video, error = future.result()
+            if error:
+                failed.set()
+                break
+    finally:
+        # Sections still rendering see failed and kill their jobs; nothing waits for them
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    output_path = media_dir / "videos" / Path(code_file).stem / QUALITY_DIRS[quality] / f"{scene_name}.mp4"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if render_pool.cancelled(cancel):
+        return None, "cancelled"
+    if failed.is_set():
+        return render_whole(code_file, scene_name, media_dir, quality, output_path, cancel)
+    result = concat_clips(clips, output_path)
+    if result.returncode != 0:
+        return None, result.stderr
+    return output_path, None
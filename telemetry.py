@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# Run telemetry.
+# Each pipeline stage is wrapped in a span that records its wall time and any
+# counters it adds (tokens, cache hits, attempt numbers). Spans are appended
+# as JSON lines to the run report (RUN_REPORT, or the workspace's
+# logs/run.jsonl) and summarized per stage at the end of the run.
+
+REPORT_PATH = os.getenv("RUN_REPORT")
+COUNTERS = ("input_tokens", "output_tokens", "cache_read", "cache_write", "media_hits", "media_misses")
+
+_records = []
+_lock = threading.Lock()
+_report_path = Path(REPORT_PATH) if REPORT_PATH else None
+
+
+def set_report(path):
+    """Send spans to path unless RUN_REPORT already picked a file"""
+    global _report_path
+    if not REPORT_PATH:
+        _report_path = Path(path)
+
+
+def emit(record):
+    with _lock:
+        _records.append(record)
+        if _report_path is not None:
+            _report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(_report_path, "a") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def span(stage, **fields):
+    """Time a stage; the yielded dict can be filled with counters while it runs"""
+    record = {"stage": stage, "start": time.time(), **fields}
+    started = time.perf_counter()
+    try:
+        yield record
+        record.setdefault("ok", True)
+    except BaseException as e:
+        record["ok"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration"] = round(time.perf_counter() - started, 4)
+        emit(record)
+
+
+def event(stage, duration=0.0, **fields):
+    """Record something that was timed elsewhere, or that has no duration"""
+    emit({"stage": stage, "start": time.time() - duration, "duration": round(duration, 4), **fields})
+
+
+def summary(records=None):
+    """Per stage: count, failures, total and max duration, summed counters"""
+    stages = {}
+    with _lock:
+        records = list(_records if records is None else records)
+    for record in records:
+        stage = stages.setdefault(record["stage"], {"count": 0, "failed": 0, "total": 0.0, "max": 0.0, "hits": 0})
+        stage["count"] += 1
+        stage["failed"] += record.get("ok") is False
+        stage["hits"] += bool(record.get("cache_hit"))
+        stage["total"] += record.get("duration", 0.0)
+        stage["max"] = max(stage["max"], record.get("duration", 0.0))
+        for counter in COUNTERS:
+            if counter in record:
+                stage[counter] = stage.get(counter, 0) + (record[counter] or 0)
+    return stages
+
+
+def print_summary(records=None):
+    stages = summary(records)
+    if not stages:
+        return
+    print("\nRun summary:")
+    print(f"{'stage':<18}{'count':>6}{'failed':>8}{'hits':>6}{'total s':>10}{'max s':>9}  counters")
+    for name, stage in sorted(stages.items(), key=lambda item: -item[1]["total"]):
+        counters = " ".join(f"{counter}={stage[counter]}" for counter in COUNTERS if counter in stage)
+        print(f"{name:<18}{stage['count']:>6}{stage['failed']:>8}{stage['hits']:>6}{stage['total']:>10.2f}{stage['max']:>9.2f}  {counters}")
+    if _report_path is not None:
+        print(f"Report: {_report_path}")
@@ -0,0 +1,127 @@
+# Local stand-in for the Anthropic Messages API, for exercising manim_agent offline.
+#
+#   python test/stub_anthropic.py --response outputs.py
+#   ANTHROPIC_BASE_URL=http://localhost:8765 ANTHROPIC_KEY=stub python manim_agent.py
+#
+# Every request is answered with the given file wrapped in <output> tags. Prompt
+# caching is simulated: the prefix up to each cache_control breakpoint is hashed,
+# and usage reports a cache write the first time a prefix is seen and a cache read
+# afterwards, so breakpoint placement can be checked without a real API key.
+
+import json
+import hashlib
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+seen_prefixes = set()
+
+
+def estimate_tokens(value):
+    return len(json.dumps(value)) // 4
+
+
+def prompt_blocks(body):
+    """Flatten system and messages into the ordered list of blocks that get cached"""
+    system = body.get("system") or []
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}]
+    blocks = list(system)
+    for message in body["messages"]:
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        blocks.extend(content)
+    return blocks
+
+
+def simulate_cache(body):
+    blocks = prompt_blocks(body)
+    total = estimate_tokens(blocks)
+    cache_read = cache_write = 0
+
+    for i, block in enumerate(blocks):
+        if "cache_control" not in block:
+            continue
+        prefix = blocks[:i + 1]
+        digest = hashlib.sha256(json.dumps(prefix, sort_keys=True).encode()).hexdigest()
+        tokens = estimate_tokens(prefix)
+        if digest in seen_prefixes:
+            cache_read = tokens
+            cache_write = 0
+        else:
+            seen_prefixes.add(digest)
+            cache_write = tokens - cache_read
+
+    return {
+        "input_tokens": total - cache_read - cache_write,
+        "cache_read_input_tokens": cache_read,
+        "cache_creation_input_tokens": cache_write,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    response_text = ""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        usage = simulate_cache(body)
+        usage["output_tokens"] = len(self.response_text) // 4
+        print(f"[stub] {body['model']} usage={usage}")
+
+        message = {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": self.response_text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+        if body.get("stream"):
+            self.send_stream(message)
+        else:
+            self.send_json(message)
+
+    def send_json(self, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, message):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        def event(name, payload):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        text = message["content"][0]["text"]
+        event("message_start", {"type": "message_start", "message": {**message, "content": [], "stop_reason": None}})
+        event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        for i in range(0, len(text), 64):
+            event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text[i:i + 64]}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": message["usage"]["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned Messages API responses locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--response", default="outputs.py", help="File returned inside <output> tags")
+    args = parser.parse_args()
+
+    with open(args.response, "r") as f:
+        StubHandler.response_text = f"<output>\n{f.read()}\n</output>"
+
+    print(f"Stub Anthropic API listening on http://localhost:{args.port}")
+    ThreadingHTTPServer(("localhost", args.port), StubHandler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
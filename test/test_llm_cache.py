@@ -0,0 +1,84 @@
+# python -m pytest test/test_llm_cache.py
+# Cached responses must be found for equivalent prompts, evicted oldest first, and missed cleanly when gone.
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import llm_cache
+
+CHAIN = [
+    {"role": "system", "content": "You write manim tutorials."},
+    {"role": "user", "content": "Explain the chain rule.\nUse a graph."},
+]
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", tmp_path / "llm")
+    return tmp_path / "llm"
+
+
+def test_whitespace_noise_keeps_the_key():
+    noisy = [
+        {"role": "system", "content": "  You write manim tutorials.\n"},
+        {"role": "user", "content": "Explain the chain rule.   \nUse a graph.\n\n"},
+    ]
+    assert llm_cache.cache_key(noisy, "model") == llm_cache.cache_key(CHAIN, "model")
+
+
+def test_model_params_and_content_change_the_key():
+    key = llm_cache.cache_key(CHAIN, "model", {"temperature": 0})
+    assert llm_cache.cache_key(CHAIN, "other-model", {"temperature": 0}) != key
+    assert llm_cache.cache_key(CHAIN, "model", {"temperature": 1}) != key
+    assert llm_cache.cache_key(CHAIN[:1], "model", {"temperature": 0}) != key
+    # Indentation inside a line is meaningful in code
+    indented = [CHAIN[0], {"role": "user", "content": "Explain the chain rule.\n    Use a graph."}]
+    assert llm_cache.cache_key(indented, "model", {"temperature": 0}) != key
+
+
+def test_put_then_get():
+    key = llm_cache.cache_key(CHAIN, "model")
+    assert llm_cache.get(key) is None
+    llm_cache.put(key, "<output>code</output>")
+    assert llm_cache.get(key) == "<output>code</output>"
+
+
+def test_eviction_removes_least_recently_used_first():
+    keys = [llm_cache.cache_key(CHAIN, f"model-{i}") for i in range(3)]
+    for age, key in enumerate(keys):
+        llm_cache.put(key, "x" * 100)
+        os.utime(llm_cache._entry_path(key), (1000 + age, 1000 + age))
+
+    # A hit makes the oldest entry the most recently used
+    assert llm_cache.get(keys[0]) == "x" * 100
+    size = llm_cache._entry_path(keys[0]).stat().st_size
+    llm_cache.evict(max_bytes=2 * size)
+
+    assert llm_cache.get(keys[1]) is None
+    assert llm_cache.get(keys[0]) == "x" * 100
+    assert llm_cache.get(keys[2]) == "x" * 100
+
+
+def test_entry_evicted_during_a_hit_is_a_miss(monkeypatch):
+    key = llm_cache.cache_key(CHAIN, "model")
+    llm_cache.put(key, "response")
+
+    # Another process evicts the entry between the read and the mtime bump
+    def evicted(path, *args, **kwargs):
+        Path(path).unlink()
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert llm_cache.get(key) is None
+
+
+def test_corrupt_entry_is_a_miss():
+    key = llm_cache.cache_key(CHAIN, "model")
+    llm_cache.put(key, "response")
+    llm_cache._entry_path(key).write_text('{"key": ')
+    assert llm_cache.get(key) is None
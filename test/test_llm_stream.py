@@ -0,0 +1,107 @@
+# python -m pytest test/test_llm_stream.py
+# Streamed code must reach disk as it arrives, stop early when it can't parse, and fall back to a plain request.
+
+import sys
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import anthropic
+import llm_stream
+import stub_anthropic
+
+GOOD = "from manim import *\n\n" + "".join(f"x{i} = {i}\n" for i in range(30))
+# Line 3 can never parse, and enough lines follow it to trigger a check
+BROKEN = "from manim import *\n\ndef play(scene)\n" + "".join(f"    x{i} = {i}\n" for i in range(30))
+
+
+def chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_complete_output_is_written_as_it_arrives(tmp_path):
+    output_file = tmp_path / "code.py"
+    stream = llm_stream.OutputStream(output_file)
+    for delta in chunks(f"Here you go:\n<output>\n{GOOD}</output>\nDone."):
+        stream.feed(delta)
+    assert stream.done
+    stream.close()
+    assert output_file.read_text() == f"\n{GOOD}"
+    assert stream.code == f"\n{GOOD}"
+    assert stream.text.endswith("Done.")
+
+
+def test_unterminated_output_is_flushed_on_close(tmp_path):
+    output_file = tmp_path / "code.py"
+    stream = llm_stream.OutputStream(output_file)
+    for delta in chunks(f"<output>{GOOD}"):
+        stream.feed(delta)
+    assert not stream.done
+    stream.close()
+    # The tail held back in case it was the start of </output> is written too
+    assert output_file.read_text() == GOOD
+
+
+def test_broken_output_aborts_before_the_end(tmp_path):
+    output_file = tmp_path / "code.py"
+    stream = llm_stream.OutputStream(output_file)
+    with pytest.raises(llm_stream.GenerationAborted, match="line 3"):
+        for delta in chunks(f"<output>{BROKEN}</output>"):
+            stream.feed(delta)
+    assert not stream.done
+    assert stream._file is None
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    # manim_agent talking to test/stub_anthropic.py, recording whether each request streamed
+    requests = []
+
+    class Handler(stub_anthropic.StubHandler):
+        def send_json(self, payload):
+            requests.append(False)
+            super().send_json(payload)
+
+        def send_stream(self, message):
+            requests.append(True)
+            super().send_stream(message)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setenv("ANTHROPIC_KEY", "stub")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    monkeypatch.setenv("LLM_STREAM", "1")
+    import manim_agent
+
+    monkeypatch.setattr(manim_agent, "client", anthropic.Anthropic(api_key="stub", base_url=f"http://localhost:{server.server_port}"))
+    yield manim_agent, Handler, requests
+    server.shutdown()
+
+
+def test_streamed_code_is_used(stub_api, tmp_path):
+    manim_agent, handler, requests = stub_api
+    handler.response_text = f"<output>\n{GOOD}</output>"
+    output_file = tmp_path / "code.py"
+    assert manim_agent.llm_code([{"role": "user", "content": "make a tutorial"}], output_file) == GOOD.strip()
+    assert requests == [True]
+    assert output_file.read_text() == GOOD.strip()
+
+
+def test_aborted_streams_retry_then_fall_back_to_a_plain_request(stub_api, tmp_path):
+    manim_agent, handler, requests = stub_api
+    handler.response_text = f"<output>\n{BROKEN}</output>"
+    output_file = tmp_path / "code.py"
+    code = manim_agent.llm_code([{"role": "user", "content": "make a tutorial"}], output_file, stream_retries=2)
+    assert requests == [True, True, True, False]
+    # The fallback's answer is kept as it is, for the repair loop to deal with
+    assert code == BROKEN.strip()
+    assert output_file.read_text() == BROKEN.strip()
@@ -0,0 +1,49 @@
+# python -m pytest test/test_optimizer.py
+# The optimizer must rewrite constant updaters and leave everything else exactly as written.
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import optimizer
+
+
+def test_constant_always_redraw_is_built_once():
+    code = '''from manim import *
+
+class FullTutorial(Scene):
+    def construct(self):
+        axes = Axes()
+        arrow = always_redraw(lambda: Arrow(axes.c2p(0, 0), axes.c2p(1, 3)))
+        self.play(FadeIn(axes), Create(arrow))
+'''
+    optimized, rewrites = optimizer.optimize(code)
+    assert "arrow = Arrow(axes.c2p(0, 0), axes.c2p(1, 3))" in optimized
+    assert "always_redraw" not in optimized
+    assert len(rewrites) == 1
+
+
+def test_transformed_mobject_keeps_its_updater():
+    # After the Transform the updater redraws the arrow, a static arrow would stay a dot
+    code = '''from manim import *
+
+class FullTutorial(Scene):
+    def construct(self):
+        axes = Axes()
+        arrow = always_redraw(lambda: Arrow(axes.c2p(0, 0), axes.c2p(1, 3)))
+        self.add(arrow)
+        self.play(Transform(arrow, Dot()))
+'''
+    assert optimizer.optimize(code) == (code, [])
+
+
+def test_code_that_does_not_parse_is_returned_unchanged():
+    code = '''from manim import *
+
+class FullTutorial(Scene):
+    def construct(self)
+        arrow = always_redraw(lambda: Arrow(ORIGIN, UP))
+'''
+    assert optimizer.optimize(code) == (code, [])
+    assert optimizer.optimize_code(code) == code
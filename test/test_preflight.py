@@ -0,0 +1,79 @@
+# python -m pytest test/test_preflight.py
+# Static checks must reject broken generations and let renderable ones through, without rendering.
+
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import preflight
+
+VALID = '''from manim import Scene, Text, Write
+
+
+def play_intro(scene):
+    title = Text("Intro")
+    scene.play(Write(title))
+
+
+class FullTutorial(Scene):
+    def construct(self):
+        play_intro(self)
+'''
+
+
+@pytest.fixture(autouse=True)
+def fresh_star_imports():
+    preflight.star_import_names.cache_clear()
+    yield
+    preflight.star_import_names.cache_clear()
+
+
+def test_valid_tutorial_passes():
+    assert preflight.check(VALID) == []
+
+
+def test_banned_import_is_rejected():
+    errors = preflight.check("import subprocess\n" + VALID)
+    assert errors == ["line 1: import of 'subprocess' is not allowed in generated tutorials"]
+
+
+def test_unknown_name_is_flagged():
+    errors = preflight.check(VALID.replace('title = Text("Intro")', 'title = Txet("Intro")'))
+    assert errors == ["line 5: name 'Txet' is not defined"]
+
+
+def test_missing_scene_is_reported():
+    errors = preflight.check(VALID.replace("FullTutorial", "Tutorial"))
+    assert errors == ["no top-level class named 'FullTutorial' is defined"]
+
+
+def test_star_import_falls_back_to_declared_all(monkeypatch):
+    # tutorial_helpers imports manim, so without manim installed it can't be imported
+    real_import = importlib.import_module
+
+    def no_manim(name, *args, **kwargs):
+        if name in ("manim", "tutorial_helpers"):
+            raise ImportError(f"No module named '{name}'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(importlib, "import_module", no_manim)
+    code = VALID.replace("from manim import Scene, Text, Write\n", "from manim import Scene, Text, Write\nfrom tutorial_helpers import *\n")
+
+    helpers = code.replace("scene.play(Write(title))", "scene.play(Write(shrink_to_fit(title)))")
+    assert preflight.check(helpers) == []
+
+    typo = code.replace("scene.play(Write(title))", "scene.play(Write(shrink_to_fitt(title)))")
+    assert preflight.check(typo) == ["line 7: name 'shrink_to_fitt' is not defined"]
+
+
+def test_unknown_star_import_skips_name_checks(monkeypatch):
+    def nothing_imports(name, *args, **kwargs):
+        raise ImportError(f"No module named '{name}'")
+
+    monkeypatch.setattr(importlib, "import_module", nothing_imports)
+    code = "from manim import *\n" + VALID.replace('title = Text("Intro")', 'title = Txet("Intro")')
+    assert preflight.check(code) == []
@@ -0,0 +1,92 @@
+# python -m pytest test/test_repair.py
+# Errors from the code, its repair candidates and its section scenes must map back to the right function.
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import repair
+import sections
+
+CODE = '''from manim import *
+
+
+def play_intro(scene):
+    title = Text("Intro")
+    scene.play(Write(title))
+
+
+def play_graph(scene):
+    axes = Axes()
+    scene.play(Create(axes))
+    scene.play(Wiggle(axes))
+
+
+class FullTutorial(Scene):
+    def construct(self):
+        play_intro(self)
+        play_graph(self)
+'''
+
+
+def traceback(*frames):
+    lines = ["Traceback (most recent call last):"]
+    lines += [f'  File "{file}", line {line}, in {func}' for file, line, func in frames]
+    lines.append("NameError: name 'Wiggle' is not defined")
+    return "\n".join(lines)
+
+
+def test_candidate_frames_map_to_the_code():
+    error = traceback(("/w/code/tutorial_candidate2.py", 18, "construct"), ("/w/code/tutorial_candidate2.py", 12, "play_graph"))
+    assert repair.error_lines(error, "/w/code/tutorial.py", CODE) == [18, 12]
+    assert repair.locate(CODE, error, "/w/code/tutorial.py")["name"] == "play_graph"
+
+
+def test_section_scene_frames_map_to_the_code():
+    scene_code = sections.section_scene_code(CODE, sections.split_sections(CODE))
+    appended = len(scene_code.splitlines())
+    error = traceback(
+        ("/w/code/tutorial_candidate1_sections.py", appended, "construct"),
+        ("/w/code/tutorial_candidate1_sections.py", 12, "play_graph"),
+    )
+    # The appended section scene has no counterpart in the code
+    assert repair.error_lines(error, "/w/code/tutorial.py", CODE) == [12]
+    assert repair.locate(CODE, error, "/w/code/tutorial.py")["name"] == "play_graph"
+
+
+def test_frames_from_other_files_are_ignored():
+    error = traceback(("/w/code/tutorial.py", 6, "play_intro"), ("/repo/tutorial_helpers.py", 40, "section_title"))
+    assert repair.error_lines(error, "/w/code/tutorial.py", CODE) == [6]
+    assert repair.locate(CODE, error, "/w/code/tutorial.py")["name"] == "play_intro"
+
+
+def test_rich_traceback_frames():
+    error = "/w/code/tutorial_sections.py:12 in play_graph\n/repo/manim/scene/scene.py:1000 in play"
+    assert repair.error_lines(error, "tutorial.py", CODE) == [12]
+
+
+def test_static_checks_in_two_functions_repair_the_whole_file():
+    error = "Preflight found problems:\n- line 5: unknown name\n- line 12: unknown name Wiggle"
+    assert repair.error_lines(error, "tutorial.py") == [5, 12]
+    assert repair.locate(CODE, error, "tutorial.py") is None
+
+
+def test_splice_replaces_only_the_function():
+    error = traceback(("tutorial.py", 12, "play_graph"))
+    unit = repair.locate(CODE, error, "tutorial.py")
+    fix = '''def play_graph(scene):
+    axes = Axes()
+    scene.play(Create(axes))
+    scene.play(Indicate(axes))
+'''
+    patched = repair.splice(CODE, unit, fix)
+    assert "Indicate(axes)" in patched
+    assert "Wiggle" not in patched
+    assert patched.replace("Indicate", "Wiggle") == CODE
+
+
+def test_splice_rejects_fixes_that_do_not_fit():
+    unit = repair.locate(CODE, traceback(("tutorial.py", 12, "play_graph")), "tutorial.py")
+    assert repair.splice(CODE, unit, "def play_other(scene):\n    pass\n") is None
+    assert repair.splice(CODE, unit, "def play_graph(scene)\n    pass\n") is None
@@ -0,0 +1,79 @@
+# python -m pytest test/test_sections.py
+# Section keys must change exactly when the code a section renders from changes.
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sections
+
+CODE = '''from manim import *
+
+TITLE_COLOR = BLUE
+
+
+def play_intro(scene):
+    title = Text("Intro", color=TITLE_COLOR)
+    scene.play(Write(title))
+
+
+def play_graph(scene):
+    axes = Axes()
+    scene.play(Create(axes))
+
+
+def play_outro(scene):
+    scene.play(FadeOut(*scene.mobjects))
+
+
+class FullTutorial(Scene):
+    def construct(self):
+        play_intro(self)
+        play_graph(self)
+        play_outro(self)
+'''
+
+
+def keys(code):
+    return dict(sections.split_sections(code))
+
+
+def test_sections_follow_construct():
+    assert [name for name, _ in sections.split_sections(CODE)] == ["play_intro", "play_graph", "play_outro"]
+
+
+def test_editing_a_section_changes_only_its_key():
+    before = keys(CODE)
+    after = keys(CODE.replace("scene.play(Create(axes))", "scene.play(Create(axes), run_time=2)"))
+    assert after["play_graph"] != before["play_graph"]
+    assert after["play_intro"] == before["play_intro"]
+    assert after["play_outro"] == before["play_outro"]
+
+
+def test_reordering_sections_keeps_their_keys():
+    reordered = CODE.replace("play_intro(self)\n        play_graph(self)", "play_graph(self)\n        play_intro(self)")
+    assert keys(reordered) == keys(CODE)
+
+
+def test_editing_shared_code_changes_every_key():
+    before = keys(CODE)
+    constant = keys(CODE.replace("TITLE_COLOR = BLUE", "TITLE_COLOR = RED"))
+    config = keys(CODE.replace("class FullTutorial(Scene):", "class FullTutorial(MovingCameraScene):"))
+    for after in (constant, config):
+        assert all(after[name] != before[name] for name in before)
+
+
+def test_constructs_that_are_not_only_section_calls_are_not_split():
+    assert sections.split_sections(CODE.replace("        play_graph(self)\n", "        self.wait()\n")) is None
+    assert sections.split_sections(CODE.replace("play_graph(self)", "play_graph(self, 2)")) is None
+    assert sections.split_sections(CODE.replace("class FullTutorial", "class Tutorial")) is None
+    one_section = CODE.replace("        play_graph(self)\n        play_outro(self)\n", "")
+    assert sections.split_sections(one_section) is None
+
+
+def test_section_scenes_keep_the_code_lines():
+    scene_code = sections.section_scene_code(CODE, sections.split_sections(CODE))
+    assert scene_code.splitlines()[:len(CODE.splitlines())] == CODE.splitlines()
+    assert "class FullTutorialSection1(FullTutorial):\n    def construct(self):\n        play_graph(self)\n" in scene_code
+    compile(scene_code, "tutorial_sections.py", "exec")
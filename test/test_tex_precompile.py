@@ -0,0 +1,59 @@
+# python -m pytest test/test_tex_precompile.py
+# Precompiled formulas must reach the scene without LaTeX running again.
+
+import os
+import sys
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+manim = pytest.importorskip("manim")
+
+import media_cache
+import tex_precompile
+
+CODE = '''from manim import *
+
+class FullTutorial(Scene):
+    def construct(self):
+        self.add(MathTex(r"x^2 + y^2 = 1"), MathTex(r"a", r"+", r"b"))
+'''
+
+
+def latex_available():
+    template = manim.config["tex_template"]
+    return shutil.which(template.tex_compiler) and shutil.which("dvisvgm")
+
+
+@pytest.mark.skipif(not latex_available(), reason="needs LaTeX and dvisvgm")
+@pytest.mark.parametrize("shared_cache", [True, False])
+def test_precompiled_mathtex_runs_no_latex(tmp_path, monkeypatch, shared_cache):
+    monkeypatch.setattr(media_cache, "ROOT", tmp_path / "cache")
+    monkeypatch.setenv("MEDIA_CACHE", "1" if shared_cache else "0")
+
+    with manim.tempconfig({"media_dir": str(tmp_path / "media")}):
+        tex_dir = manim.config.get_dir("tex_dir")
+        assert tex_precompile.precompile(CODE, tex_dir) == []
+        if shared_cache:
+            assert list((tmp_path / "cache" / "tex").glob("*.svg"))
+        tex_precompile.install()
+        media_cache.install()
+
+        commands = []
+
+        def no_subprocess(*args, **kwargs):
+            commands.append(args)
+            raise AssertionError(f"subprocess started: {args}")
+
+        # manim 0.17 shells out with os.system for both latex and dvisvgm
+        monkeypatch.setattr(os, "system", lambda command: commands.append(command) or 1)
+        monkeypatch.setattr(subprocess, "run", no_subprocess)
+        monkeypatch.setattr(subprocess, "Popen", no_subprocess)
+
+        manim.MathTex(r"x^2 + y^2 = 1")
+        manim.MathTex(r"a", r"+", r"b")
+
+    assert commands == []
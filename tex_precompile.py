@@ -0,0 +1,277 @@
+import re
+import ast
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+import telemetry
+import media_cache
+
+# Batch LaTeX precompilation for generated tutorials.
+# Every MathTex/Tex string that can be read statically from the code is
+# rendered as one page of a single LaTeX document, dvisvgm splits the result
+# into one SVG per page, and each SVG is stored in the shared media cache
+# and in manim's Tex dir under the hash manim would use. All LaTeX errors
+# are reported from one pass.
+#
+# manim 0.17 only skips LaTeX when it finds the .dvi, not the .svg, so
+# install() wraps tex_to_svg_file in the render workers to return a
+# precompiled SVG before manim compiles anything. media_cache.install()
+# wraps on top of it and serves the shared copy first.
+
+TEX_CLASSES = {
+    # class name: (default environment, default arg separator)
+    "MathTex": ("align*", " "),
+    "SingleStringMathTex": ("align*", None),
+    "Tex": ("center", ""),
+}
+STANDALONE_CLASS = re.compile(r"\\documentclass(\[[^\]]*\])?\{standalone\}")
+
+
+def install():
+    """Make tex_to_svg_file return an SVG already in the Tex dir instead of running LaTeX, once per process"""
+    from manim import config
+    from manim.utils import tex_file_writing
+    from manim.mobject.text import tex_mobject
+
+    if getattr(tex_file_writing.tex_to_svg_file, "_precompiled", False) or getattr(tex_file_writing.tex_to_svg_file, "_media_cache", False):
+        # Already wrapped, possibly underneath the media cache
+        return
+    original = tex_file_writing.tex_to_svg_file
+
+    def tex_to_svg_file(expression, environment=None, tex_template=None):
+        template = tex_template or config["tex_template"]
+        if environment is not None:
+            texcode = template.get_texcode_for_expression_in_env(expression, environment)
+        else:
+            texcode = template.get_texcode_for_expression(expression)
+        svg_file = config.get_dir("tex_dir") / f"{tex_file_writing.tex_hash(texcode)}.svg"
+        if svg_file.exists():
+            return svg_file
+        return original(expression, environment, tex_template)
+
+    tex_to_svg_file._precompiled = True
+    # tex_mobject imported the function by name, so both references are replaced
+    tex_file_writing.tex_to_svg_file = tex_to_svg_file
+    tex_mobject.tex_to_svg_file = tex_to_svg_file
+
+
+def _string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def extract_tex_calls(code):
+    """Find MathTex/Tex/SingleStringMathTex calls whose arguments are all literals"""
+    calls = []
+    for node in ast.walk(ast.parse(code)):
+        if not isinstance(node, ast.Call):
+            continue
+        name = node.func.id if isinstance(node.func, ast.Name) else getattr(node.func, "attr", None)
+        if name not in TEX_CLASSES or not node.args:
+            continue
+
+        strings = [_string(arg) for arg in node.args]
+        if any(s is None for s in strings):
+            continue
+
+        environment, separator = TEX_CLASSES[name]
+        isolate = []
+        color_keys = []
+        supported = True
+        for keyword in node.keywords:
+            if keyword.arg == "tex_environment":
+                environment = _string(keyword.value)
+                supported = supported and environment is not None
+            elif keyword.arg == "arg_separator":
+                separator = _string(keyword.value)
+                supported = supported and separator is not None
+            elif keyword.arg == "substrings_to_isolate":
+                try:
+                    isolate = list(ast.literal_eval(keyword.value))
+                except ValueError:
+                    supported = False
+            elif keyword.arg == "tex_to_color_map":
+                if isinstance(keyword.value, ast.Dict):
+                    color_keys = [_string(key) for key in keyword.value.keys]
+                    supported = supported and None not in color_keys
+                else:
+                    supported = False
+            elif keyword.arg == "tex_template":
+                supported = False
+
+        if supported and (separator is not None or len(strings) == 1):
+            calls.append({
+                "class": name,
+                "strings": strings,
+                "environment": environment,
+                "separator": separator,
+                "isolate": isolate,
+                "color_keys": color_keys,
+                "lineno": node.lineno,
+            })
+    return calls
+
+
+def tex_expressions(call):
+    """The modified expressions manim will compile for one call, using manim's own string handling"""
+    from manim import MathTex, SingleStringMathTex
+
+    if call["class"] == "SingleStringMathTex":
+        mob = object.__new__(SingleStringMathTex)
+        return [mob._get_modified_expression(call["strings"][0])]
+
+    # Mirror the attributes MathTex.__init__ sets before it splits the strings
+    mob = object.__new__(MathTex)
+    mob.arg_separator = call["separator"]
+    mob.substrings_to_isolate = call["isolate"]
+    mob.tex_to_color_map = {key: None for key in call["color_keys"]}
+    mob.brace_notation_split_occurred = False
+    pieces = mob._break_up_tex_strings(call["strings"])
+
+    # The joined string is the formula itself; each piece is compiled again to count submobjects
+    full = mob._get_modified_expression(call["separator"].join(pieces))
+    return [full] + [mob._get_modified_expression(piece) for piece in pieces if piece.strip()]
+
+
+def _compile_command(tex_compiler, output_format, tex_file, out_dir):
+    if tex_compiler == "xelatex":
+        return [tex_compiler, "-no-pdf", "-interaction=nonstopmode", f"-output-directory={out_dir}", str(tex_file)]
+    return [tex_compiler, "-interaction=nonstopmode", f"-output-format={output_format[1:]}", f"-output-directory={out_dir}", str(tex_file)]
+
+
+def _log_errors(log_text, page_lines):
+    """Map '! error' / 'l.<n>' pairs in a LaTeX log back to page indices"""
+    errors = {}
+    message = None
+    for line in log_text.splitlines():
+        if line.startswith("! "):
+            message = line[2:].strip()
+        elif message and re.match(r"l\.(\d+)", line):
+            lineno = int(re.match(r"l\.(\d+)", line).group(1))
+            for index, (start, end) in enumerate(page_lines):
+                if start <= lineno <= end:
+                    errors.setdefault(index, message)
+                    break
+            message = None
+    return errors
+
+
+def _compile_group(preamble, bodies, tex_template, work_dir):
+    """Compile one multi-page document, returns ({page index: svg path}, {page index: error})"""
+    work_dir.mkdir(parents=True, exist_ok=True)
+    lines = [STANDALONE_CLASS.sub(r"\\documentclass{article}", preamble.rstrip()), r"\pagestyle{empty}", r"\begin{document}"]
+    page_lines = []
+    for body in bodies:
+        start = len(lines) + 1
+        # \null keeps pages whose formula has no box from being dropped
+        lines += [r"\null", body.strip("\n"), r"\clearpage"]
+        page_lines.append((start, len(lines)))
+    lines.append(r"\end{document}")
+
+    tex_file = work_dir / "batch.tex"
+    tex_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    subprocess.run(
+        _compile_command(tex_template.tex_compiler, tex_template.output_format, tex_file, work_dir),
+        capture_output=True, text=True, cwd=work_dir,
+    )
+
+    log_file = tex_file.with_suffix(".log")
+    errors = _log_errors(log_file.read_text(errors="replace"), page_lines) if log_file.exists() else {}
+    dvi_file = tex_file.with_suffix(tex_template.output_format)
+    if errors or not dvi_file.exists():
+        # Errors that can't be tied to an expression are left for the real render to report
+        return {}, errors
+
+    command = ["dvisvgm", "-p", "1-", "-n", "-v", "0", "-o", str(work_dir / "page-%p.svg"), str(dvi_file)]
+    if tex_template.output_format == ".pdf":
+        command.insert(1, "--pdf")
+    subprocess.run(command, capture_output=True, text=True)
+    pages = {}
+    for svg in work_dir.glob("page-*.svg"):
+        pages[int(re.search(r"page-(\d+)\.svg", svg.name).group(1)) - 1] = svg
+    if len(pages) != len(bodies):
+        # Page boundaries don't line up with expressions, so nothing can be trusted
+        return {}, {}
+    return pages, {}
+
+
+def precompile(code, tex_dir):
+    """Compile every static TeX string in code into tex_dir, returns a list of failures"""
+    try:
+        from manim import config
+        from manim.utils.tex_file_writing import tex_hash
+    except ImportError:
+        return []
+
+    tex_template = config["tex_template"]
+    if not shutil.which(tex_template.tex_compiler) or not shutil.which("dvisvgm"):
+        return []
+
+    try:
+        calls = extract_tex_calls(code)
+    except SyntaxError:
+        return []
+
+    tex_dir = Path(tex_dir)
+    tex_dir.mkdir(parents=True, exist_ok=True)
+
+    # hash -> (texcode, expression, source line), skipping anything already cached
+    pending = {}
+    for call in calls:
+        try:
+            expressions = tex_expressions(call)
+        except Exception:
+            continue
+        for expression in expressions:
+            texcode = tex_template.get_texcode_for_expression_in_env(expression, call["environment"])
+            name = tex_hash(texcode)
+            if name in pending or (tex_dir / f"{name}.svg").exists():
+                continue
+            shared = media_cache.ROOT / "tex" / f"{media_cache.tex_key(tex_template, texcode)}.svg"
+            if media_cache.enabled() and shared.exists():
+                continue
+            pending[name] = (texcode, expression, call["lineno"])
+
+    groups = {}
+    for name, (texcode, _, _) in pending.items():
+        preamble, _, rest = texcode.partition(r"\begin{document}")
+        body = rest.rpartition(r"\end{document}")[0]
+        if STANDALONE_CLASS.search(preamble):
+            groups.setdefault(preamble, []).append((name, body))
+
+    failures = []
+    with telemetry.span("latex", expressions=len(pending), groups=len(groups)) as record, tempfile.TemporaryDirectory() as tmp:
+        for index, (preamble, entries) in enumerate(groups.items()):
+            pages, errors = _compile_group(preamble, [body for _, body in entries], tex_template, Path(tmp) / f"group{index}")
+
+            if errors:
+                for page, message in errors.items():
+                    _, expression, lineno = pending[entries[page][0]]
+                    failures.append({"line": lineno, "expression": expression, "error": message})
+                # Compile the rest again without the broken formulas
+                entries = [entry for page, entry in enumerate(entries) if page not in errors]
+                if not entries:
+                    continue
+                pages, _ = _compile_group(preamble, [body for _, body in entries], tex_template, Path(tmp) / f"group{index}-retry")
+
+            for page, svg in pages.items():
+                name = entries[page][0]
+                texcode = pending[name][0]
+                if media_cache.enabled():
+                    media_cache.store("tex", media_cache.tex_key(tex_template, texcode), ".svg", svg)
+                (tex_dir / f"{name}.tex").write_text(texcode, encoding="utf-8")
+                shutil.move(str(svg), tex_dir / f"{name}.svg")
+        record["ok"] = not failures
+
+    return failures
+
+
+def format_failures(failures):
+    """Render LaTeX failures the way the repair prompt expects an error message"""
+    lines = ["LaTeX failed to compile these expressions:"]
+    for failure in failures:
+        lines.append(f"- line {failure['line']}: {failure['expression']!r}: {failure['error']}")
+    return "\n".join(lines)
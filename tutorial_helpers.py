@@ -0,0 +1,95 @@
+from functools import lru_cache
+
+from manim import *
+
+# Shared building blocks for generated tutorials.
+# Every generated file used to carry its own copy of shrink_to_fit, the frame
+# constants, title cards and fade-out-everything. The generation prompt now
+# advertises this module instead, so generated code starts with
+#
+#   from manim import *
+#   from tutorial_helpers import *
+#
+# and spends its tokens on the tutorial itself. Text mobjects are cached by
+# their arguments, so repeated titles and labels are laid out once per render
+# worker and copied afterwards.
+#
+# Bump __version__ whenever a signature or behaviour changes: it is part of
+# the prompt, so cached generations written against the old helpers are not
+# reused.
+
+__version__ = "1"
+__all__ = [
+    "FRAME_W", "FRAME_H", "MARGIN", "shrink_to_fit", "cached_text", "title_card", "section_title",
+    "bullet_slide", "fade_out_all",
+]
+
+FRAME_W = config.frame_width
+FRAME_H = config.frame_height
+MARGIN = 0.8
+
+
+def shrink_to_fit(mobj, margin=MARGIN):
+    """Scale mobj down so it fits the frame width (and height) minus margin, returns mobj"""
+    if mobj.width > FRAME_W - margin:
+        mobj.scale_to_fit_width(FRAME_W - margin)
+    if mobj.height > FRAME_H - margin:
+        mobj.scale_to_fit_height(FRAME_H - margin)
+    return mobj
+
+
+@lru_cache(maxsize=256)
+def _build_text(text, options):
+    return Text(text, **dict(options))
+
+
+def cached_text(text, **kwargs):
+    """Text(text, **kwargs), built once per distinct arguments and returned as a fresh copy"""
+    options = tuple(sorted(kwargs.items()))
+    try:
+        hash(options)
+    except TypeError:
+        # Colors and other unhashable options just skip the cache
+        return Text(text, **kwargs)
+    return _build_text(text, options).copy()
+
+
+def section_title(text, font_size=48):
+    """Bold heading at the top edge, shrunk to fit"""
+    title = shrink_to_fit(cached_text(text, font_size=font_size, weight=BOLD))
+    return title.to_edge(UP)
+
+
+def title_card(scene, title, subtitle=None, hold=1):
+    """Write a centered title (and optional subtitle), hold it, then fade it out"""
+    heading = shrink_to_fit(cached_text(title, font_size=60, weight=BOLD))
+    if subtitle is None:
+        scene.play(Write(heading, run_time=2))
+        scene.wait(hold)
+        scene.play(FadeOut(heading))
+        return
+    sub = shrink_to_fit(cached_text(subtitle, font_size=36, slant=ITALIC))
+    sub.next_to(heading, DOWN, buff=0.5)
+    scene.play(Write(heading, run_time=2))
+    scene.play(FadeIn(sub, shift=UP))
+    scene.wait(hold)
+    scene.play(FadeOut(heading), FadeOut(sub))
+
+
+def bullet_slide(items, title=None, font_size=32, buff=0.35):
+    """VGroup of bullet lines left-aligned under an optional section title; the title is element 0 if given"""
+    bullets = VGroup(*(cached_text(f"• {item}", font_size=font_size) for item in items))
+    bullets.arrange(DOWN, aligned_edge=LEFT, buff=buff)
+    if title is None:
+        return shrink_to_fit(bullets.move_to(ORIGIN))
+    heading = section_title(title)
+    shrink_to_fit(bullets, margin=MARGIN + 0.4)
+    bullets.next_to(heading, DOWN, buff=0.6)
+    return VGroup(heading, bullets)
+
+
+def fade_out_all(scene, run_time=1):
+    """Fade out everything on screen and clear the scene"""
+    if scene.mobjects:
+        scene.play(*(FadeOut(mobj) for mobj in scene.mobjects), run_time=run_time)
+    scene.clear()
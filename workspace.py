@@ -0,0 +1,39 @@
+import os
+import time
+import uuid
+from pathlib import Path
+
+# Per-run workspaces.
+# Every run gets its own directory under RUNS_DIR holding the generated code,
+# the manim media dir and the logs, so runs on the same host never share an
+# outputs.py or a videos folder and can go in parallel.
+#
+#   runs/<timestamp>-<id>/
+#       outputs.py
+#       media/
+#       logs/
+
+RUNS_DIR = Path(os.getenv("RUNS_DIR", "runs"))
+
+
+def create(root=None, name=None):
+    """Make a workspace directory, returns {"name", "root", "code_file", "media_dir", "log_dir"}"""
+    name = name or f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    root = Path(root or RUNS_DIR) / name
+    workspace = {
+        "name": name,
+        "root": root,
+        "code_file": root / "outputs.py",
+        "media_dir": root / "media",
+        "log_dir": root / "logs",
+    }
+    workspace["media_dir"].mkdir(parents=True, exist_ok=True)
+    workspace["log_dir"].mkdir(parents=True, exist_ok=True)
+    return workspace
+
+
+def write_log(workspace, name, text):
+    """Save text under the workspace's logs dir, returns the path"""
+    path = workspace["log_dir"] / name
+    path.write_text(text)
+    return path